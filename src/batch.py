@@ -0,0 +1,136 @@
+"""
+Generate reports and collated CSVs from the command line, without opening a window. For example:
+
+    python batch.py report 'lettings/*.rman' --out-dir reports
+    python batch.py collate 'lettings/*.rman' --tax-year 2022 --out 2022.csv
+    python batch.py portfolio 'lettings/*.rman' --out portfolio.pdf
+"""
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import report_generator
+from rent_manager import collate, document
+from rent_manager.state.rent_calculations import RentCalculations
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument('--workers', type=int, help='the number of worker processes, by default one per core')
+subparsers = parser.add_subparsers(dest='command', required=True)
+
+report_parser = subparsers.add_parser('report', help='generate a PDF report for each file')
+report_parser.add_argument('files', nargs='+', help='.rman files, or glob patterns matching them')
+report_parser.add_argument('--out-dir', help='the directory to write the reports to, by default next to each file')
+
+collate_parser = subparsers.add_parser('collate', help='export the transactions of all the files in a tax year as CSV')
+collate_parser.add_argument('files', nargs='+', help='.rman files, or glob patterns matching them')
+collate_parser.add_argument('--tax-year', type=int, required=True,
+                            help='the year in which the tax year starts, on 6 Apr')
+collate_parser.add_argument('--out', required=True, help='the CSV file to write')
+
+portfolio_parser = subparsers.add_parser('portfolio', help='generate one PDF report of all the files, with contents')
+portfolio_parser.add_argument('files', nargs='+', help='.rman files, or glob patterns matching them')
+portfolio_parser.add_argument('--out', required=True, help='the PDF file to write')
+
+
+def expand_paths(patterns: list[str]) -> list[str]:
+    """
+    Expand glob patterns, since not every shell does. Each file is only included once.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            logging.warning(f'No files match {pattern}')
+        paths.extend(matches)
+    return list(dict.fromkeys(paths))
+
+
+def report_path(path: str, out_dir: Optional[str]) -> Path:
+    return Path(out_dir or Path(path).parent) / f'{report_generator.report_name(path)}.pdf'
+
+
+def report_path_collisions(paths: list[str], out_dir: Optional[str]) -> dict[Path, list[str]]:
+    """
+    :return: the reports which more than one of the files would be written to, such as files with the same name in
+    different directories written to one `out_dir`, with those files
+    """
+    files_by_report: dict[str, tuple[Path, list[str]]] = {}
+    for path in paths:
+        export_path = report_path(path, out_dir)
+        key = os.path.normcase(os.path.abspath(export_path))
+        files_by_report.setdefault(key, (export_path, []))[1].append(path)
+    return {export_path: files for export_path, files in files_by_report.values() if len(files) > 1}
+
+
+def write_report(path: str, out_dir: Optional[str]) -> str:
+    data = document.load(path)
+    calculations = RentCalculations.from_rent_manager_state(data)
+
+    export_path = report_path(path, out_dir)
+    report_generator.generate_report(data, calculations, export_path)
+    return str(export_path)
+
+
+def lay_out_report(path: str) -> report_generator.LaidOutSection:
+    data = document.load(path)
+    return report_generator.lay_out_report(data, RentCalculations.from_rent_manager_state(data))
+
+
+def show_progress(done: int, total: int) -> None:
+    print(f'{done}/{total}', end='\r' if done < total else '\n', file=sys.stderr)
+
+
+def main() -> int:
+    args = parser.parse_args()
+    paths = expand_paths(args.files)
+    if not paths:
+        parser.error('no files to process')
+
+    if args.command == 'report':
+        collisions = report_path_collisions(paths, args.out_dir)
+        if collisions:
+            parser.error('more than one file would be written to the same report, please rename them or write them '
+                         'to separate directories:\n' + '\n'.join(
+                             f'{export_path}: {", ".join(files)}' for export_path, files in collisions.items()
+                         ))
+        if args.out_dir is not None:
+            Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+        reports, errors = collate.process_files(
+            write_report, paths, args.out_dir, on_progress=show_progress, max_workers=args.workers
+        )
+        for report in reports:
+            if report is not None:
+                logging.info(f'Wrote {report}')
+    elif args.command == 'portfolio':
+        # each property is laid out in its own process, and only the pages are put together here
+        reports, errors = collate.process_files(
+            lay_out_report, paths, on_progress=show_progress, max_workers=args.workers
+        )
+        if not errors:
+            report_generator.generate_portfolio_report(
+                [(Path(path).stem, report) for path, report in zip(paths, reports)], args.out
+            )
+            logging.info(f'Wrote {args.out}')
+    else:
+        errors = collate.export_collated_csv(
+            paths, args.out, date(args.tax_year, 4, 5), date(args.tax_year + 1, 4, 5),
+            on_progress=show_progress, max_workers=args.workers
+        )
+        if not errors:
+            logging.info(f'Wrote {args.out}')
+
+    for path, message in errors.items():
+        logging.error(f'{path}: {message}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    logging.basicConfig(format='[%(levelname)s] %(message)s', level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Compare drawing the "All transactions" table straight to the PDF with writing it as HTML for `write_html` to parse, as
+`put_table` did before. Run from the `src` directory with `python -m benchmarks.report_tables`.
+"""
+import argparse
+import itertools
+import re
+import timeit
+import tracemalloc
+
+from benchmarks.report_wrap import transaction_rows
+from report_generator import PDFGenerator
+from rent_manager.state.rent_calculations import RentCalculations
+from tests.fixtures import make_ledger
+
+
+class LegacyPDFGenerator(PDFGenerator):
+    def put_table(self, headers, data):
+        with self.tag('table', border='1'):
+            # noinspection SpellCheckingInspection
+            with self.tag('thead'):
+                with self.tag('tr', bgcolor='#d8e1ed'):
+                    def get_weight(header):
+                        return 1 if isinstance(header, str) else header[1]
+
+                    total_weight = sum(get_weight(header) for header in headers)
+                    widths = [int(get_weight(header) / total_weight * 100) for header in headers]
+                    shortfall = 100 - sum(widths)
+                    for i in range(shortfall):
+                        widths[i] += 1
+
+                    for header, width in zip(headers, widths):
+                        with self.tag('th', width=f'{width}%'):
+                            if isinstance(header, str):
+                                self.text(header)
+                            else:
+                                self.text(header[0])
+            # noinspection SpellCheckingInspection
+            with self.tag('tbody'):
+                for i, row in enumerate(data):
+                    wrapped_row = [self._wrap(cell, width) for cell, width in zip(row, widths)]
+                    wrapped_sub_rows = itertools.zip_longest(*wrapped_row, fillvalue=' ')
+                    color = '#FFFFFF' if i % 2 == 0 else '#e9eef5'
+                    for sub_row in wrapped_sub_rows:
+                        with self.tag('tr', bgcolor=color):
+                            for cell in sub_row:
+                                with self.tag('td'):
+                                    self.text(cell)
+
+
+def put_transactions(generator_type, rows):
+    generator = generator_type()
+    generator.put_table(['Date', 'Type', 'Amount', ('Comment', 2), 'Balance', 'Float'], rows)
+    generator.write_buffer()
+    return generator.pdf
+
+
+def colors_of_text(pdf):
+    """
+    :return: the fill color, which PDF text is drawn in, of each piece of text in the content streams of `pdf`, as a
+    tuple of RGB components
+    """
+    colors = []
+    for page in pdf.pages.values():
+        color, saved_colors, operands = (0.0, 0.0, 0.0), [], []
+        # strings are matched whole, as they may contain spaces
+        for token in re.findall(rb'\((?:\\.|[^\\)])*\)|\S+', page['content']):
+            if token == b'q':
+                saved_colors.append(color)
+            elif token == b'Q':
+                color = saved_colors.pop()
+            elif token == b'rg':
+                color = tuple(float(operand) for operand in operands[-3:])
+            elif token == b'g':
+                color = (float(operands[-1]),) * 3
+            elif token == b'Tj':
+                colors.append(color)
+            operands.append(token)
+    return colors
+
+
+def check_text_color(generator_type, rows):
+    pdf = put_transactions(generator_type, rows)
+    text_color = tuple(float(component) for component in pdf.text_color.split()[:-1]) * (
+        3 if pdf.text_color.endswith(' g') else 1)
+    assert set(colors_of_text(pdf)) == {text_color}, 'the text of the table is not drawn in the text color'
+
+
+def measure(name, generator_type, rows, repeat):
+    seconds = min(timeit.repeat(lambda: put_transactions(generator_type, rows), number=1, repeat=repeat))
+
+    tracemalloc.start()
+    pdf = put_transactions(generator_type, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{name:>6}: {seconds * 1000:8.1f} ms, {peak / 1024:8.0f} KiB peak, {pdf.page} pages')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=12 * 25)
+    parser.add_argument('--per-month', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_ledger(args.months, args.per_month)
+    calculations = RentCalculations.from_rent_manager_state(data)
+    rows = list(transaction_rows(calculations, long_words=False))
+    print(f'{len(rows)} rows')
+
+    check_text_color(PDFGenerator, rows)
+
+    measure('html', LegacyPDFGenerator, rows, args.repeat)
+    measure('direct', PDFGenerator, rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare wrapping the cells of the "All transactions" table with memoized string widths against the `_wrap` it
+replaced, which measured every candidate line from scratch. Run from the `src` directory with
+`python -m benchmarks.report_wrap`.
+"""
+import argparse
+import re
+import timeit
+
+from currency import format_currency
+from report_generator import PDFGenerator
+from rent_manager.state.rent_calculations import RentCalculations
+from tests.fixtures import make_ledger
+
+
+class LegacyPDFGenerator(PDFGenerator):
+    def _wrap(self, cell: str, width_percent: int):
+        input_lines = cell.split('\n')
+        if len(input_lines) > 1:
+            return sum((self._wrap(line, width_percent) for line in input_lines), [])
+
+        cell_width_px = self.pdf.epw * width_percent / 100 - 5
+
+        words = re.findall(r'(\s*\S+)(\s*)', cell)
+        lines = []
+        line = ''
+        previous_whitespace = ''
+        i = 0
+        while i < len(words):
+            word, trailing_whitespace = words[i]
+
+            if self.pdf.get_string_width(word) > cell_width_px:
+                sub_word = ''
+                j = 0
+                for j, letter in enumerate(word):
+                    sub_word += letter
+                    if self.pdf.get_string_width(line + sub_word) > cell_width_px:
+                        break
+                lines.append(line + previous_whitespace + sub_word[:-1])
+                line = ''
+                previous_whitespace = ''
+
+                words[i] = word[j:], trailing_whitespace
+            else:
+                if self.pdf.get_string_width(line + word) > cell_width_px:
+                    lines.append(line)
+                    line = ''
+                    previous_whitespace = ''
+                line += previous_whitespace + word
+                previous_whitespace = trailing_whitespace
+
+                i += 1
+
+        if line:
+            lines.append(line)
+        return lines
+
+
+def transaction_rows(calculations: RentCalculations, long_words: bool):
+    date_format = '%d/%m/%Y'
+    for annotated in calculations.balance_annotated_transactions:
+        transaction = annotated.inner
+        comment = transaction.comment
+        if long_words:
+            # references and URLs pasted into comments have no spaces to wrap at
+            comment = comment.replace(' ', '-')
+        yield [
+            transaction.date.strftime(date_format),
+            transaction.type,
+            format_currency(transaction.amount),
+            comment,
+            format_currency(annotated.current_balance),
+            format_currency(annotated.current_float)
+        ]
+
+
+def wrap_all(generator_type, rows):
+    # the widths of the "All transactions" columns, as given to `_wrap` by `put_table`
+    widths = [15, 15, 14, 28, 14, 14]
+    generator = generator_type()
+    return [[generator._wrap(cell, width) for cell, width in zip(row, widths)] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=12 * 50)
+    parser.add_argument('--per-month', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_ledger(args.months, args.per_month)
+    calculations = RentCalculations.from_rent_manager_state(data)
+
+    for long_words in (False, True):
+        rows = list(transaction_rows(calculations, long_words))
+        print(f'{len(rows)} rows' + (', comments without spaces' if long_words else ''))
+
+        assert wrap_all(LegacyPDFGenerator, rows) == wrap_all(PDFGenerator, rows)
+        for name, generator_type in (('legacy', LegacyPDFGenerator), ('memoized', PDFGenerator)):
+            seconds = min(timeit.repeat(lambda: wrap_all(generator_type, rows), number=1, repeat=args.repeat))
+            print(f'{name:>9}: {seconds * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Compare the memory use and throughput of the slotted `AnyTransaction` views with the `__dict__` based wrappers they
+replaced. Run from the `src` directory with `python -m benchmarks.transactions`.
+"""
+import abc
+import argparse
+import operator
+import timeit
+import tracemalloc
+from datetime import date
+
+from rent_manager.state.all_transactions import iter_all_transactions, AnyTransactionRent, AnyTransactionOther
+from tests.fixtures import make_ledger
+
+
+class LegacyAnyTransaction(abc.ABC):
+    @property
+    @abc.abstractmethod
+    def date(self) -> date:
+        pass
+
+
+class LegacyAnyTransactionOther(LegacyAnyTransaction):
+    def __init__(self, inner) -> None:
+        super().__init__()
+        self.inner = inner
+
+    @property
+    def date(self) -> date:
+        return self.inner.date_
+
+    @property
+    def type(self) -> str:
+        return self.inner.reason.readable_name()
+
+    @property
+    def amount(self) -> int:
+        return self.inner.amount
+
+    @property
+    def comment(self) -> str:
+        return self.inner.comment
+
+
+class LegacyAnyTransactionRent(LegacyAnyTransaction):
+    def __init__(self, inner) -> None:
+        super().__init__()
+        self.inner = inner
+
+    @property
+    def date(self) -> date:
+        return self.inner.received_on
+
+    @property
+    def type(self) -> str:
+        return 'Rent payment'
+
+    @property
+    def amount(self) -> int:
+        return self.inner.amount
+
+    @property
+    def comment(self) -> str:
+        month_format = '%b %Y'
+        return f'For month {self.inner.for_month.strftime(month_format)}'
+
+
+def legacy_get_all_transactions(data):
+    return sorted(
+        [LegacyAnyTransactionRent(rent_payment) for rent_payment in data.rent_manager_main_state.rent_payments]
+        +
+        [LegacyAnyTransactionOther(other_transaction)
+         for other_transaction in data.rent_manager_main_state.other_transactions],
+        key=operator.attrgetter('date')
+    )
+
+
+def read_all(transactions):
+    # the report reads every field, and the comment is read again when rows are wrapped
+    for transaction in transactions:
+        transaction.date, transaction.type, transaction.amount, transaction.comment, transaction.comment
+
+
+def measure(name, data, get_transactions, repeat):
+    seconds = min(timeit.repeat(lambda: read_all(get_transactions(data)), number=1, repeat=repeat))
+
+    tracemalloc.start()
+    transactions = list(get_transactions(data))
+    read_all(transactions)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del transactions
+
+    print(f'{name:>8}: {seconds * 1000:8.1f} ms, {retained / 1024:8.0f} KiB retained, {peak / 1024:8.0f} KiB peak')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=12 * 200)
+    parser.add_argument('--per-month', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_ledger(args.months, args.per_month)
+    count = len(data.rent_manager_main_state.rent_payments) + len(data.rent_manager_main_state.other_transactions)
+    print(f'{count} transactions')
+
+    measure('legacy', data, legacy_get_all_transactions, args.repeat)
+    measure('slotted', data, iter_all_transactions, args.repeat)
+
+    slotted = list(iter_all_transactions(data))
+    assert [t.unwrap() for t in slotted] == [t.inner for t in legacy_get_all_transactions(data)]
+    assert isinstance(slotted[0], (AnyTransactionRent, AnyTransactionOther))
+
+
+if __name__ == '__main__':
+    main()
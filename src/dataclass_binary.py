@@ -0,0 +1,397 @@
+import dataclasses
+import enum
+import struct
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, Callable, Iterable, Optional, Type
+
+Keep = Callable[[tuple[str, ...], Any], bool]
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class StringTable:
+    none_index = 0xFFFFFFFF
+
+    def __init__(self):
+        self.indices: dict[str, int] = {}
+
+    def index(self, s: Optional[str]) -> int:
+        if s is None:
+            return self.none_index
+        try:
+            return self.indices[s]
+        except KeyError:
+            index = self.indices[s] = len(self.indices)
+            return index
+
+    @classmethod
+    def lookup(cls, index: int, strings: list[str]) -> Optional[str]:
+        return None if index == cls.none_index else strings[index]
+
+
+class Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def unpack(self, record: struct.Struct) -> tuple:
+        values = record.unpack_from(self.data, self.pos)
+        self.pos += record.size
+        return values
+
+    def take(self, size: int) -> memoryview:
+        if self.pos + size > len(self.data):
+            raise DecodeError('Unexpected end of data')
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def string(self) -> str:
+        length, = self.unpack(count_record)
+        return str(self.take(length), 'utf-8')
+
+
+count_record = struct.Struct('<I')
+
+# the version of the layout written by `dumps`, which `loads` checks
+format_version = 1
+
+
+def write_string(s: str, out: bytearray):
+    encoded = s.encode('utf-8')
+    out += count_record.pack(len(encoded))
+    out += encoded
+
+
+class Codec(ABC):
+    """
+    Writes and reads one type. Its `kind` describes how values are stored, and is written in the schema of each file
+    so that a file can still be read once the types have changed.
+    """
+    kind: str
+
+    @abstractmethod
+    def write(self, value, out: bytearray, strings: StringTable):
+        pass
+
+    @abstractmethod
+    def read(self, reader: Reader, strings: list[str], keep: Optional[Keep], path: tuple[str, ...]):
+        pass
+
+
+class FixedWidthCodec(Codec, ABC):
+    """
+    A codec with a `record`, which converts values to and from the tuple of fields packed into it, so that lists of
+    them can be packed and unpacked in bulk
+    """
+    record: struct.Struct
+
+    @abstractmethod
+    def raw(self, value, strings: StringTable) -> tuple:
+        pass
+
+    @abstractmethod
+    def value(self, raw: tuple, strings: list[str]):
+        pass
+
+    def values(self, raws: Iterable[tuple], strings: list[str]) -> Iterable:
+        return (self.value(raw, strings) for raw in raws)
+
+    def write(self, value, out: bytearray, strings: StringTable):
+        out += self.record.pack(*self.raw(value, strings))
+
+    def read(self, reader: Reader, strings: list[str], keep: Optional[Keep], path: tuple[str, ...]):
+        return self.value(reader.unpack(self.record), strings)
+
+
+class ScalarCodec(FixedWidthCodec):
+    def __init__(self, kind: str, to_raw: Callable[[Any, StringTable], Any], from_raw: Callable[[Any, list[str]], Any],
+                 from_column: Callable[[tuple, list[str]], Iterable] = None):
+        self.kind = kind
+        self.fmt = fmt = scalar_formats[kind]
+        self.record = struct.Struct(f'<{fmt}')
+        self.to_raw = to_raw
+        self.from_raw = from_raw
+        if from_column is None:
+            def from_column(column, strings):
+                return [from_raw(x, strings) for x in column]
+        self.from_column = from_column
+
+    def raw(self, value, strings: StringTable) -> tuple:
+        return self.to_raw(value, strings),
+
+    def value(self, raw: tuple, strings: list[str]):
+        return self.from_raw(raw[0], strings)
+
+
+def record_builder(_type: Optional[Type], names: list[str]) -> Callable[..., Any]:
+    """
+    :param _type: the dataclass to build, or None to build nothing from a record it no longer has
+    :param names: the fields stored, in order
+    :return: a function building the dataclass from the values of the stored fields. Fields which it no longer has
+    are left out, and fields which were not stored take their defaults.
+    """
+    if _type is None:
+        return lambda *_values: None
+    # dataclass fields are in the same order as the positional arguments of the constructor
+    if names == [field.name for field in dataclasses.fields(_type)]:
+        return _type
+    field_names = {field.name for field in dataclasses.fields(_type)}
+    kept = [(i, name) for i, name in enumerate(names) if name in field_names]
+    return lambda *values: _type(**{name: values[i] for i, name in kept})
+
+
+class RecordCodec(FixedWidthCodec):
+    """
+    A dataclass whose fields are all scalars, stored as one fixed width record
+    """
+
+    def __init__(self, _type: Optional[Type], fields: list[tuple[str, ScalarCodec]], name: str = None):
+        self.type = _type
+        self.name = name or _type.__qualname__
+        self.kind = f'record:{self.name}'
+        self.fields = fields
+        self.build = record_builder(_type, [name for name, _ in fields])
+        self.record = struct.Struct('<' + ''.join(codec.fmt for _, codec in fields))
+        self.to_raws = [(name, codec.to_raw) for name, codec in fields]
+        self.from_raws = [codec.from_raw for _, codec in fields]
+
+    def raw(self, value, strings: StringTable) -> tuple:
+        return tuple(to_raw(getattr(value, name), strings) for name, to_raw in self.to_raws)
+
+    def value(self, raw: tuple, strings: list[str]):
+        return self.build(*[from_raw(x, strings) for from_raw, x in zip(self.from_raws, raw)])
+
+    def values(self, raws: Iterable[tuple], strings: list[str]) -> Iterable:
+        # convert a column at a time, which avoids a Python call per field of every record
+        columns = list(zip(*raws)) or [()] * len(self.fields)
+        return map(self.build,
+                   *(codec.from_column(column, strings) for (_, codec), column in zip(self.fields, columns)))
+
+
+class CompositeCodec(Codec):
+    def __init__(self, _type: Optional[Type], fields: list[tuple[str, Codec]], name: str = None):
+        self.type = _type
+        self.name = name or _type.__qualname__
+        self.kind = f'record:{self.name}'
+        self.fields = fields
+        self.build = record_builder(_type, [name for name, _ in fields])
+
+    def write(self, value, out: bytearray, strings: StringTable):
+        for name, codec in self.fields:
+            codec.write(getattr(value, name), out, strings)
+
+    def read(self, reader: Reader, strings: list[str], keep: Optional[Keep], path: tuple[str, ...]):
+        return self.build(*[
+            # a field which is no longer kept is read past, without asking `keep` about its items
+            codec.read(reader, strings, keep if self.type is not None else None, path + (name,))
+            for name, codec in self.fields
+        ])
+
+
+class SequenceCodec(Codec):
+    def __init__(self, sequence_type: Type, item_codec: Codec):
+        self.sequence_type = sequence_type
+        self.item_codec = item_codec
+        self.kind = f'{sequence_type.__name__}:{item_codec.kind}'
+
+    def write(self, value, out: bytearray, strings: StringTable):
+        out += count_record.pack(len(value))
+        for item in value:
+            self.item_codec.write(item, out, strings)
+
+    def read(self, reader: Reader, strings: list[str], keep: Optional[Keep], path: tuple[str, ...]):
+        count, = reader.unpack(count_record)
+        item_codec = self.item_codec
+        if isinstance(item_codec, FixedWidthCodec):
+            chunk = reader.take(count * item_codec.record.size)
+            items = item_codec.values(item_codec.record.iter_unpack(chunk), strings)
+        else:
+            items = (item_codec.read(reader, strings, keep, path) for _ in range(count))
+        if keep is not None:
+            items = (item for item in items if keep(path, item))
+        return self.sequence_type(items)
+
+
+def _unchanged(x, _strings):
+    return x
+
+
+def _string_to_raw(s, strings: StringTable):
+    return strings.index(s)
+
+
+def _enum_codec(enum_type: Type[enum.Enum]) -> ScalarCodec:
+    # members are stored by value, as in JSON, so that reordering them does not change what a file means
+    if not all(isinstance(member.value, int) for member in enum_type):
+        raise TypeError(f'Cannot store {enum_type} in binary form, as its values are not all integers')
+    return ScalarCodec('enum', lambda member, _strings: member.value, lambda value, _strings: enum_type(value),
+                       lambda column, _strings: map(enum_type, column))
+
+
+# the struct format of each kind of scalar
+scalar_formats = {'bool': '?', 'int': 'q', 'float': 'd', 'str': 'I', 'date': 'i', 'enum': 'q'}
+
+
+codecs: dict[Type, Codec] = {}
+
+
+def codec_for(_type) -> Codec:
+    try:
+        return codecs[_type]
+    except KeyError:
+        pass
+
+    if _type in (bool, int, float):
+        codec = ScalarCodec(_type.__name__, _unchanged, _unchanged, _unchanged)
+    elif _type is str:
+        codec = ScalarCodec('str', _string_to_raw, StringTable.lookup)
+    elif _type is date:
+        codec = ScalarCodec('date', lambda d, _strings: d.toordinal(), lambda d, _strings: date.fromordinal(d),
+                            lambda column, _strings: map(date.fromordinal, column))
+    elif isinstance(_type, type) and issubclass(_type, enum.Enum):
+        codec = _enum_codec(_type)
+    elif getattr(_type, '__origin__', None) in (list, tuple):
+        codec = SequenceCodec(_type.__origin__, codec_for(_type.__args__[0]))
+    elif dataclasses.is_dataclass(_type):
+        fields = [(field.name, codec_for(field.type)) for field in dataclasses.fields(_type)]
+        if all(isinstance(field_codec, ScalarCodec) for _, field_codec in fields):
+            codec = RecordCodec(_type, fields)
+        else:
+            codec = CompositeCodec(_type, fields)
+    else:
+        raise TypeError(f'Cannot store {_type} in binary form')
+
+    codecs[_type] = codec
+    return codec
+
+
+def schema_of(codec: Codec, schema: dict[str, list[tuple[str, str]]]):
+    """
+    Add the names and kinds of the fields of each dataclass stored by `codec` to `schema`, by the dataclass' name
+    """
+    if isinstance(codec, (RecordCodec, CompositeCodec)):
+        schema[codec.name] = [(name, field_codec.kind) for name, field_codec in codec.fields]
+        for _, field_codec in codec.fields:
+            schema_of(field_codec, schema)
+    elif isinstance(codec, SequenceCodec):
+        schema_of(codec.item_codec, schema)
+
+
+def reading_codec(kind: str, _type: Optional[Type], schema: dict[str, list[tuple[str, str]]]) -> Codec:
+    """
+    :param kind: how the values were stored, from the schema of the file
+    :param _type: the type to read them as now, or None to read past them
+    :param schema: the schema of the file
+    :return: a codec reading what was stored as `kind`, which is that of `_type` when its layout has not changed
+    """
+    codec = codec_for(_type) if _type is not None else None
+    if kind in scalar_formats:
+        if codec is None:
+            return ScalarCodec(kind, _unchanged, _unchanged, _unchanged)
+        if codec.kind != kind:
+            raise DecodeError(f'{_type} was stored as {kind}')
+        return codec
+
+    # the codec of `_type` is used when what was stored is read the same way, since it may be faster
+    prefix, _, rest = kind.partition(':')
+    if prefix in ('list', 'tuple'):
+        if codec is None:
+            return SequenceCodec(list, reading_codec(rest, None, schema))
+        if not isinstance(codec, SequenceCodec):
+            raise DecodeError(f'{_type} was stored as {kind}')
+        item_codec = reading_codec(rest, _type.__args__[0], schema)
+        return codec if item_codec is codec.item_codec else SequenceCodec(codec.sequence_type, item_codec)
+
+    if prefix == 'record' and rest in schema:
+        if codec is not None and not isinstance(codec, (RecordCodec, CompositeCodec)):
+            raise DecodeError(f'{_type} was stored as {kind}')
+        field_types = {field.name: field.type for field in dataclasses.fields(_type)} if _type is not None else {}
+        fields = [
+            (name, reading_codec(field_kind, field_types.get(name), schema))
+            for name, field_kind in schema[rest]
+        ]
+        if codec is not None and len(fields) == len(codec.fields) and all(
+                name == current_name and field_codec is current_codec
+                for (name, field_codec), (current_name, current_codec) in zip(fields, codec.fields)):
+            return codec
+        if all(isinstance(field_codec, ScalarCodec) for _, field_codec in fields):
+            return RecordCodec(_type, fields, rest)
+        return CompositeCodec(_type, fields, rest)
+
+    raise DecodeError(f'Unknown kind {kind}')
+
+
+def dumps(obj, _type=None) -> bytes:
+    """
+    Encode `obj` as the format version, the schema of the dataclasses stored, a string table, and then its fields.
+    Strings are stored once, and referred to by their index in the table.
+
+    The schema names the fields of each dataclass, in the order they are stored, with how each is stored, so that
+    `loads` can read a file written before fields were added, removed or reordered.
+    """
+    codec = codec_for(type(obj) if _type is None else _type)
+    strings = StringTable()
+    body = bytearray()
+    codec.write(obj, body, strings)
+
+    schema = {}
+    schema_of(codec, schema)
+    out = bytearray(count_record.pack(format_version))
+    write_string(codec.kind, out)
+    out += count_record.pack(len(schema))
+    for name, fields in schema.items():
+        write_string(name, out)
+        out += count_record.pack(len(fields))
+        for field_name, kind in fields:
+            write_string(field_name, out)
+            write_string(kind, out)
+
+    out += count_record.pack(len(strings.indices))
+    for s in strings.indices:
+        write_string(s, out)
+    return bytes(out + body)
+
+
+def loads(data: bytes, _type, keep: Keep = None):
+    """
+    :param data: data produced by `dumps`
+    :param _type: the type to load
+    :param keep: optionally, decides whether to keep each list item, as in `dataclass_json.load_stream`
+    :return: the loaded object
+    """
+    reader = Reader(data)
+    try:
+        version, = reader.unpack(count_record)
+        if version != format_version:
+            raise DecodeError(f'Unsupported format version {version}')
+        kind = reader.string()
+        schema = {}
+        schema_count, = reader.unpack(count_record)
+        for _ in range(schema_count):
+            name = reader.string()
+            field_count, = reader.unpack(count_record)
+            schema[name] = [(reader.string(), reader.string()) for _ in range(field_count)]
+
+        string_count, = reader.unpack(count_record)
+        strings = [reader.string() for _ in range(string_count)]
+
+        result = reading_codec(kind, _type, schema).read(reader, strings, keep, ())
+    except DecodeError:
+        raise
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise DecodeError(f'Cannot be interpreted as the correct type: {e}') from e
+    if reader.pos != len(reader.data):
+        raise DecodeError('Extra data')
+    return result
+
+
+def dump(obj, file):
+    file.write(dumps(obj))
+
+
+def load(_type, file, keep: Keep = None):
+    return loads(file.read(), _type, keep)
@@ -1,48 +1,129 @@
 import dataclasses
 import enum
 import json
+import re
+import threading
 from abc import ABC
 from datetime import date
-from typing import Type
+from typing import Type, Callable, Any, Optional
 
 
 class Serializer(ABC):
+    """
+    Converts between objects and JSON-compatible data. Subclasses registered against a `type` handle that type and its
+    subclasses. The conversion for each type is compiled once, on first use, into a function which does no further
+    reflection, and is cached in `dumpers` or `loaders`.
+    """
     registry: dict[Type, Type['Serializer']] = {}
+    dumpers: dict[Type, Callable[[Any], Any]] = {}
+    loaders: dict[Type, Callable[[Any], Any]] = {}
+    # the conversions of the types being compiled, see `compiled`
+    pending_dumpers: dict[Type, Callable[[Any], Any]] = {}
+    pending_loaders: dict[Type, Callable[[Any], Any]] = {}
+    compile_lock = threading.RLock()
     type = None
 
     def __init_subclass__(cls, **kwargs):
         cls.registry[cls.type] = cls
+        Serializer.dumpers.clear()
+        Serializer.loaders.clear()
 
     @classmethod
     def dump(cls, obj):
-        if dataclasses.is_dataclass(type(obj)):
-            return {
-                field.name: cls.dump(getattr(obj, field.name))
-                for field in dataclasses.fields(obj)
-            }
-        for _type in type(obj).mro():
-            if _type in cls.registry:
-                return cls.registry[_type].dump(obj)
-
-        return obj
+        return Serializer.dumper(type(obj))(obj)
 
     @classmethod
     def load(cls, data, _type):
+        return Serializer.loader(_type)(data)
+
+    @classmethod
+    def compile_dump(cls, _type) -> Callable[[Any], Any]:
+        return cls.dump
+
+    @classmethod
+    def compile_load(cls, _type) -> Callable[[Any], Any]:
+        return lambda data: cls.load(data, _type)
+
+    @staticmethod
+    def dumper(_type) -> Callable[[Any], Any]:
+        return Serializer.compiled(Serializer.dumpers, Serializer.pending_dumpers, _type, Serializer.compile_dumper)
+
+    @staticmethod
+    def loader(_type) -> Callable[[Any], Any]:
+        return Serializer.compiled(Serializer.loaders, Serializer.pending_loaders, _type, Serializer.compile_loader)
+
+    @staticmethod
+    def compiled(compiled: dict[Type, Callable[[Any], Any]], pending: dict[Type, Callable[[Any], Any]], _type,
+                 compile_type: Callable[[Type], Callable[[Any], Any]]) -> Callable[[Any], Any]:
+        """
+        Get the conversion of a type from `compiled`, or compile it with `compile_type`. Types are compiled one thread
+        at a time, and their conversions are kept in `pending` until the outermost one is finished, so that other
+        threads only find finished conversions in `compiled`.
+        """
+        try:
+            return compiled[_type]
+        except KeyError:
+            pass
+
+        with Serializer.compile_lock:
+            if _type in compiled:
+                return compiled[_type]
+            if _type in pending:
+                return pending[_type]
+
+            # allows recursive types, since the placeholder is found instead of compiling the type again, and calls
+            # the conversion once it is compiled
+            conversion_cell = []
+            pending[_type] = lambda x: conversion_cell[0](x)
+            outermost = len(pending) == 1
+            try:
+                conversion = compile_type(_type)
+                conversion_cell.append(conversion)
+                pending[_type] = conversion
+                if outermost:
+                    compiled.update(pending)
+            finally:
+                if outermost:
+                    pending.clear()
+            return conversion
+
+    @staticmethod
+    def compile_dumper(_type) -> Callable[[Any], Any]:
+        if dataclasses.is_dataclass(_type):
+            field_dumpers = [(field.name, Serializer.dump) for field in dataclasses.fields(_type)]
+
+            def dumper(obj):
+                return {name: dump(getattr(obj, name)) for name, dump in field_dumpers}
+        else:
+            serializer = Serializer.find_serializer(_type)
+            dumper = serializer.compile_dump(_type) if serializer else identity
+        return dumper
+
+    @staticmethod
+    def compile_loader(_type) -> Callable[[Any], Any]:
         if dataclasses.is_dataclass(_type):
-            return _type(**{
-                field.name: cls.load(data[field.name], field.type)
-                for field in dataclasses.fields(_type)
-                if field.name in data
-            })
-        for ancestor_type in _type.mro():
+            field_loaders = [(field.name, Serializer.loader(field.type)) for field in dataclasses.fields(_type)]
+
+            def loader(data):
+                return _type(**{name: load(data[name]) for name, load in field_loaders if name in data})
+        else:
+            serializer = Serializer.find_serializer(_type)
+            loader = serializer.compile_load(_type) if serializer else identity
+        return loader
+
+    @classmethod
+    def find_serializer(cls, _type) -> Optional[Type['Serializer']]:
+        for ancestor_type in getattr(_type, 'mro', list)():
             if ancestor_type in cls.registry:
-                return cls.registry[ancestor_type].load(data, _type)
+                return cls.registry[ancestor_type]
         if hasattr(_type, '__origin__'):
             for ancestor_type in _type.__origin__.mro():
                 if ancestor_type in cls.registry:
-                    return cls.registry[ancestor_type].load(data, _type)
+                    return cls.registry[ancestor_type]
+
 
-        return data
+def identity(x):
+    return x
 
 
 def iterable_serializer(t: Type):
@@ -55,10 +136,14 @@ def iterable_serializer(t: Type):
 
         @classmethod
         def load(cls, data, _type):
-            item_type = None
+            return cls.compile_load(_type)(data)
+
+        @classmethod
+        def compile_load(cls, _type) -> Callable[[Any], Any]:
+            item_loader = identity
             if hasattr(_type, '__args__'):
-                item_type = _type.__args__[0]
-            return t(Serializer.load(x, item_type) for x in data)
+                item_loader = Serializer.loader(_type.__args__[0])
+            return lambda data: t(map(item_loader, data))
 
     return IterableSerializer
 
@@ -78,6 +163,10 @@ class DateSerializer(Serializer):
     def load(cls, data, _type):
         return date.fromisoformat(data)
 
+    @classmethod
+    def compile_load(cls, _type) -> Callable[[Any], Any]:
+        return date.fromisoformat
+
 
 class EnumSerializer(Serializer):
     type = enum.Enum
@@ -90,6 +179,10 @@ class EnumSerializer(Serializer):
     def load(cls, data, _type):
         return _type(data)
 
+    @classmethod
+    def compile_load(cls, _type) -> Callable[[Any], Any]:
+        return _type
+
 
 dump_j = Serializer.dump
 load_j = Serializer.load
@@ -115,3 +208,155 @@ def load(_type, file):
         raise
     except Exception:
         raise json.JSONDecodeError('Cannot be interpreted as the correct type', data, 0)
+
+
+def dump_stream(obj, file):
+    """
+    Write the same JSON as `dump`, but write the items of lists inside dataclasses one at a time, rather than building
+    the whole document in memory first
+    """
+    if dataclasses.is_dataclass(type(obj)):
+        file.write('{')
+        for i, field in enumerate(dataclasses.fields(obj)):
+            if i:
+                file.write(', ')
+            file.write(f'{json.dumps(field.name)}: ')
+            dump_stream(getattr(obj, field.name), file)
+        file.write('}')
+    elif isinstance(obj, (list, tuple)):
+        file.write('[')
+        for i, item in enumerate(obj):
+            if i:
+                file.write(', ')
+            file.write(dumps(item))
+        file.write(']')
+    else:
+        file.write(dumps(obj))
+
+
+class StreamReader:
+    """
+    Reads JSON values from a file in chunks, so that only the value currently being parsed is held in memory
+    """
+    chunk_size = 1 << 16
+    whitespace = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def at_end(self) -> bool:
+        while True:
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return False
+            if not self.fill():
+                return True
+
+    def peek(self) -> str:
+        if self.at_end():
+            raise json.JSONDecodeError('Unexpected end of data', self.buffer, self.pos)
+        return self.buffer[self.pos]
+
+    def expect(self, options: str) -> str:
+        if self.pos < len(self.buffer) and self.buffer[self.pos] in options:
+            char = self.buffer[self.pos]
+            self.pos += 1
+            return char
+        char = self.peek()
+        if char not in options:
+            raise json.JSONDecodeError(f'Expecting one of {options!r}', self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        if self.pos >= len(self.buffer) or self.buffer[self.pos] in ' \t\n\r':
+            self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # the value may continue into the next chunk
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the buffer, or followed by a partial fraction or exponent, may also continue into
+            # the next chunk
+            if end == len(self.buffer) or (isinstance(value, (int, float)) and self.buffer[end] in '.eE+-'):
+                if self.fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def load_from_reader(reader: StreamReader, _type,
+                     keep: Callable[[tuple[str, ...], Any], bool] = None, path: tuple[str, ...] = ()):
+    if dataclasses.is_dataclass(_type) and reader.peek() == '{':
+        fields = {field.name: field for field in dataclasses.fields(_type)}
+        kwargs = {}
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.expect('}')
+        else:
+            while True:
+                name = reader.value()
+                reader.expect(':')
+                if name in fields:
+                    kwargs[name] = load_from_reader(reader, fields[name].type, keep, path + (name,))
+                else:
+                    reader.value()
+                if reader.expect(',}') == '}':
+                    break
+        return _type(**kwargs)
+
+    origin = getattr(_type, '__origin__', None)
+    if origin in (list, tuple) and reader.peek() == '[':
+        load_item = Serializer.loader(_type.__args__[0])
+        items = []
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.expect(']')
+        else:
+            while True:
+                item = load_item(reader.value())
+                if keep is None or keep(path, item):
+                    items.append(item)
+                if reader.expect(',]') == ']':
+                    break
+        return origin(items)
+
+    return load_j(reader.value(), _type)
+
+
+def load_stream(_type, file, keep: Callable[[tuple[str, ...], Any], bool] = None):
+    """
+    Load the same documents as `load`, parsing the items of lists inside dataclasses one at a time, rather than reading
+    the whole document into memory first
+    :param _type: the type to load
+    :param file: the file to read from
+    :param keep: optionally, decides whether to keep each list item, given the path of field names to the list and the
+    loaded item. Discarded items are never added to the result.
+    :return: the loaded object
+    """
+    reader = StreamReader(file)
+    try:
+        result = load_from_reader(reader, _type, keep)
+        if not reader.at_end():
+            raise json.JSONDecodeError('Extra data', reader.buffer, reader.pos)
+        return result
+    except json.JSONDecodeError:
+        raise
+    except Exception:
+        raise json.JSONDecodeError('Cannot be interpreted as the correct type', reader.buffer, reader.pos)
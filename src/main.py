@@ -1,5 +1,6 @@
 import argparse
 import logging
+import multiprocessing
 import sys
 import tkinter as tk
 import traceback
@@ -118,4 +119,6 @@ def main() -> None:
 
 
 if __name__ == '__main__':
+    # documents are loaded in a process pool when collating files
+    multiprocessing.freeze_support()
     main()
@@ -3,25 +3,25 @@ import enum
 import logging
 import sys
 import tkinter as tk
-from datetime import date
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tkinter import filedialog
 from tkinter import messagebox
 from tkinter import simpledialog
 from typing import Callable, Optional, TYPE_CHECKING
 
-import dataclass_json
 import report_generator
 import tk_utils
 from tk_utils import ResettableTimer
-from traits.core import ViewWrapper
+from traits.core import RecordView, ChangeBatch
 from traits.dialog import data_dialog
 from traits.undo_manager import UndoManager
-from . import config, updater, license_
+from . import config, document, journal, summaries, updater, license_
 from .collate_and_export import export_collated_transactions
 from .menu import DocumentManager, BasicEditorMenu
 from .state.rent_arrangement_data import RentArrangementData
-from .state.rent_calculations import RentCalculations
+from .state.rent_calculations import RentCalculations, IncrementalRentCalculations, ChangedPositions
 from .state.rent_manager_state import RentManagerState
 
 if TYPE_CHECKING:
@@ -55,9 +55,11 @@ class RentManagerApp(DocumentManager):
         self._file_path: Optional[str] = None
 
         self.changed = False
+        # counts the changes, so that a save only marks the document unchanged if none were made while it was written
+        self.change_count = 0
 
         # noinspection PyTypeChecker
-        self.view: ViewWrapper = None
+        self.view: RecordView = None
         # noinspection PyTypeChecker
         self.view_widget: tk.Widget = None
         # noinspection PyTypeChecker
@@ -66,7 +68,18 @@ class RentManagerApp(DocumentManager):
         self.data: RentManagerState = None
 
         self.calculation_timer: ResettableTimer = ResettableTimer(parent, 0.5, self.do_calculations)
+        self.autosave_timer: ResettableTimer = ResettableTimer(parent, 2, self.autosave)
+
+        # saves and journal writes happen in order, off the UI thread
+        self.document_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='document_writer')
+        # the writes whose results have not been handled yet, each by a function which waits for it then handles it
+        self.pending_writes: list[Callable[[], None]] = []
+        self.document_journal: Optional[journal.Journal] = None
+        # the lists changed since the last autosave, so that the others need not be compared
+        self.changed_fields: set[str] = set()
+
         self.calculation_results: Optional[RentCalculations] = None
+        self.rent_calculations = IncrementalRentCalculations()
         # noinspection PyTypeChecker
         self.notify_calculations_change: Callable[[RentCalculations], None] = None
         # noinspection PyTypeChecker
@@ -84,6 +97,9 @@ class RentManagerApp(DocumentManager):
 
         self._config = config.load()
 
+        # new documents are saved in the format chosen in the config, opened documents keep their format
+        self.binary_file = self._config.save_binary
+
         rent_manager_self = self
 
         class RentManagerMenu(BasicEditorMenu):
@@ -121,6 +137,8 @@ class RentManagerApp(DocumentManager):
 
     def populate_from_data(self, data: RentManagerState):
         self.changed = False
+        # a save of the previous document which is still being written does not mark this one unchanged
+        self.change_count += 1
         self.data = data
 
         self.view = data.rent_manager_main_state.view(editing=True)
@@ -137,13 +155,15 @@ class RentManagerApp(DocumentManager):
             set_on_arrangement_data_change=set_on_arrangement_data_change
         )
 
-        self.view.change_listeners.add(self.on_change)
+        self.view.change_bus.subscribe(self.on_change)
 
         self.view_widget.grid(sticky=tk_utils.STICKY_ALL)
 
         self.undo_manager = UndoManager.from_wrapper(self.view)
+        self.changed_fields.clear()
 
         self.calculation_timer.cancel()
+        self.rent_calculations.reset()
         self.do_calculations()
 
         self.notify_arrangement_data_change(self.data.rent_arrangement_data)
@@ -180,16 +200,87 @@ class RentManagerApp(DocumentManager):
     def frame(self) -> tk.Frame:
         return self._frame
 
-    def on_change(self, _action):
+    def on_change(self, changes: Optional[ChangeBatch]):
+        """
+        :param changes: the actions applied to the view, including those undone or redone, or None if only the rent
+        arrangements changed
+        """
         self.changed = True
+        self.change_count += 1
+        if changes is not None:
+            dirty_fields = changes.dirty_fields
+            self.changed_fields.update(journal.list_fields if dirty_fields is None else dirty_fields)
 
         self.calculation_timer.touch()
+        self.autosave_timer.touch()
+
+    def write_in_background(self, func: Callable, *args, error_title: Optional[str] = None,
+                            on_success: Optional[Callable[[], None]] = None):
+        """
+        :param on_success: called on the Tk thread once `func` has returned without an error
+        """
+        future = self.document_writer.submit(func, *args)
+
+        def finish():
+            exception = future.exception()
+            if finish not in self.pending_writes:
+                # already handled by `finish_writes`
+                return
+            self.pending_writes.remove(finish)
+            if exception is None:
+                if on_success is not None:
+                    on_success()
+            else:
+                logging.warning(''.join(traceback.format_exception(exception)))
+                if error_title is not None:
+                    self.changed = True
+                    messagebox.showerror(error_title, f'There was a problem writing the document:\n{exception}')
+
+        def check_done():
+            if not future.done():
+                self.frame.after(50, check_done)
+            else:
+                finish()
+
+        self.pending_writes.append(finish)
+        check_done()
+
+    def finish_writes(self):
+        """
+        Wait for the pending writes, then handle their results, such as showing an error, straight away rather than
+        once they are next polled, which would be too late if the window is about to close
+        """
+        for finish in list(self.pending_writes):
+            finish()
+
+    def wait_for_writes(self):
+        self.document_writer.submit(lambda: None).result()
+
+    def autosave(self):
+        if self.document_journal is None or not self.changed:
+            return
+
+        view_state = self.view.get_state()
+        if view_state is not None:
+            state = dataclasses.replace(self.data, rent_manager_main_state=view_state)
+            self.write_in_background(self.document_journal.append, state, frozenset(self.changed_fields))
+            self.changed_fields.clear()
+
+    def discard_journal(self):
+        self.autosave_timer.cancel()
+        if self.document_journal is not None:
+            self.write_in_background(journal.discard, self.document_journal.document_path)
+            self.document_journal = None
 
     def do_calculations(self):
         data = self.view.get_state()
         if data is not None:
             self.data.rent_manager_main_state = data
-            self.calculation_results = RentCalculations.from_rent_manager_state(self.data)
+            changed = ChangedPositions(
+                self.view.field_view('rent_payments').take_first_changed(),
+                self.view.field_view('other_transactions').take_first_changed()
+            )
+            self.calculation_results = self.rent_calculations.calculate(self.data, changed)
             self.notify_calculations_change(self.calculation_results)
 
     def filedialog(self, dialog, filetypes=(('RentManager File', '*.rman'),), modify_config_dir=True, parent=None,
@@ -227,9 +318,22 @@ class RentManagerApp(DocumentManager):
             self.save_as(state)
         else:
             state = dataclasses.replace(self.data, rent_manager_main_state=state)
-            with open(self.file_path, 'w') as f:
-                dataclass_json.dump(state, f)
-            self.changed = False
+            self.autosave_timer.cancel()
+            self.changed_fields.clear()
+            change_count = self.change_count
+
+            def on_saved():
+                if self.change_count == change_count:
+                    self.changed = False
+
+            self.write_in_background(self.save_document, state, self.file_path, self.binary_file,
+                                     self.document_journal, error_title='Cannot save', on_success=on_saved)
+
+    @staticmethod
+    def save_document(state: RentManagerState, file_path: str, binary: bool, document_journal: journal.Journal):
+        document.save(state, file_path, binary=binary)
+        document_journal.reset(state)
+        summaries.summary_cache.record(file_path, state)
 
     def save_as(self, state=None):
         if state is None:
@@ -238,10 +342,18 @@ class RentManagerApp(DocumentManager):
             return
         file_path = self.filedialog(filedialog.asksaveasfilename)
         if file_path is not None:
+            # the unsaved changes now belong to the new file
+            self.discard_journal()
             self.file_path = str(Path(file_path).with_suffix('.rman'))
+            self.document_journal = journal.Journal(
+                self.file_path,
+                dataclasses.replace(self.data, rent_manager_main_state=state)
+            )
             self.save(state)
 
     def prompt_unsaved_changes(self):
+        # the last changes may not have been delivered yet, if the app is closed straight after them
+        self.view.change_bus.flush()
         if not self.changed:
             return False
 
@@ -250,8 +362,11 @@ class RentManagerApp(DocumentManager):
         Res = UnsavedChangesResult
         if result is Res.Save:
             self.save()
-            return False
+            self.finish_writes()
+            # the document was not saved if the save was cancelled or failed, so neither is what prompted this
+            return self.changed
         elif result is Res.Continue:
+            self.discard_journal()
             return False
         elif result is Res.Cancel:
             return True
@@ -270,13 +385,30 @@ class RentManagerApp(DocumentManager):
         self.open_path(file_path)
 
     def open_path(self, file_path):
-        with open(file_path, 'r') as f:
-            data = dataclass_json.load(RentManagerState, f)
+        self.wait_for_writes()
+
+        data = document.load(file_path)
+        recovered = False
+        if journal.has_entries(file_path):
+            if messagebox.askyesno(
+                    'Recover unsaved changes',
+                    'This document has changes which were not saved before Rent Manager closed. '
+                    'Would you like to recover them?'
+            ):
+                data = journal.recover(file_path)
+                recovered = True
+            else:
+                journal.discard(file_path)
+
         self.file_path = file_path
+        self.binary_file = document.is_binary(file_path)
+        self.document_journal = journal.Journal(file_path, dataclasses.replace(data))
         self.calculation_timer.cancel()
+        self.autosave_timer.cancel()
         self.view_widget.destroy()
 
         self.populate_from_data(data)
+        self.changed = recovered
 
     def new(self):
         cancelled = self.prompt_unsaved_changes()
@@ -288,20 +420,24 @@ class RentManagerApp(DocumentManager):
             return
 
         self.calculation_timer.cancel()
+        self.discard_journal()
 
         self.view_widget.destroy()
 
         self.populate_from_data(RentManagerState(rent_arrangement_data=rent_arrangements))
 
         self.file_path: Optional[str] = None
+        self.binary_file = self.config.save_binary
 
     def undo(self):
-        self.undo_manager.undo()
-        self.on_change(None)
+        action = self.undo_manager.undo()
+        if action is not None:
+            self.on_change(ChangeBatch([action]))
 
     def redo(self):
-        self.undo_manager.redo()
-        self.on_change(None)
+        action = self.undo_manager.redo()
+        if action is not None:
+            self.on_change(ChangeBatch([action]))
 
     def edit_rent_arrangements(self):
         new_rent_arrangement_data = data_dialog(self._frame, self.data.rent_arrangement_data, 'Edit Rent Arrangements')
@@ -324,13 +460,7 @@ class RentManagerApp(DocumentManager):
         return parts[releases_index + 1]
 
     def generate_report(self):
-        if self.file_path is None:
-            filename = 'Report'
-        else:
-            filename = Path(self.file_path).stem
-
-        date_format = '%d%b%Y'
-        filename = f'{filename} {date.today().strftime(date_format)}'
+        filename = report_generator.report_name(self.file_path)
         res = self.filedialog(filedialog.asksaveasfilename, filetypes=[('PDF', '*.pdf')], modify_config_dir=False,
                               initialfile=filename)
         if not res:
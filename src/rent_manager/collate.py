@@ -0,0 +1,140 @@
+import csv
+import heapq
+import logging
+import os
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Optional, Any
+
+from currency import format_currency
+from . import document
+from .state.all_transactions import iter_all_transactions
+from .state.rent_payment import RentPayment
+
+date_format = '%d/%m/%Y'
+
+
+def load_error_message(error: BaseException) -> str:
+    """
+    :return: a description of why a document could not be loaded, for showing to the user
+    """
+    if isinstance(error, FileNotFoundError):
+        return 'File does not exist'
+    elif isinstance(error, OSError):
+        return 'Unable to read file'
+    elif isinstance(error, document.InvalidDocumentError):
+        return 'Corrupt file or invalid file type'
+    else:
+        return 'Unable to load file'
+
+
+def process_files(func: Callable[..., Any], paths: list[str], *args,
+                  on_progress: Callable[[int, int], None] = None,
+                  cancel: Optional[threading.Event] = None,
+                  max_workers: Optional[int] = None) -> tuple[list[Any], dict[str, str]]:
+    """
+    Call `func(path, *args)` for each path in parallel, in a pool of processes. A file which cannot be processed does
+    not stop the others.
+    :param on_progress: called with the number of files processed so far and the total, from the calling thread
+    :param cancel: when set, files which have not started are skipped
+    :return: the results, in the order of `paths` and None where processing failed, and the error message of each path
+    which failed
+    """
+    results: list[Any] = [None] * len(paths)
+    errors: dict[str, str] = {}
+    if not paths:
+        return results, errors
+
+    with ProcessPoolExecutor(max_workers=min(len(paths), max_workers or os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(func, path, *args): i for i, path in enumerate(paths)}
+        for done, future in enumerate(as_completed(futures), 1):
+            if cancel is not None and cancel.is_set():
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+
+            i = futures[future]
+            error = future.exception()
+            if error is None:
+                results[i] = future.result()
+            else:
+                logging.warning(f'Cannot process {paths[i]}:\n{"".join(traceback.format_exception(error))}')
+                errors[paths[i]] = load_error_message(error)
+
+            if on_progress is not None:
+                on_progress(done, len(paths))
+
+    return results, errors
+
+
+@dataclass(frozen=True)
+class TransactionsBetween:
+    """
+    A `keep` predicate for `document.load`, keeping the transactions dated after `start`, up to and including `end`
+    """
+    start: date
+    end: date
+
+    def __call__(self, _path: tuple[str, ...], item) -> bool:
+        item_date = item.received_on if isinstance(item, RentPayment) else item.date_
+        return self.start < item_date <= self.end
+
+
+def spool_transactions(path: str, keep: TransactionsBetween, spool_dir: str) -> str:
+    """
+    Write the date ordered transactions of a document which are kept by `keep` to a temporary CSV file. The rows
+    are those of the collated CSV, following the ISO format date which orders them.
+    :return: the path of the temporary file, in `spool_dir`
+    """
+    data = document.load(path, keep)
+    fd, spool_path = tempfile.mkstemp(dir=spool_dir, suffix='.csv')
+    with open(fd, 'w', newline='') as spool_file:
+        spool = csv.writer(spool_file)
+        for transaction in iter_all_transactions(data):
+            spool.writerow(
+                [
+                    transaction.date.isoformat(),
+                    transaction.date.strftime(date_format),
+                    transaction.type,
+                    format_currency(transaction.amount),
+                    transaction.comment
+                ]
+            )
+    return spool_path
+
+
+def export_collated_csv(paths: list[str], out_csv_filename: str, start: date, end: date,
+                        on_progress: Callable[[int, int], None] = None,
+                        cancel: Optional[threading.Event] = None,
+                        max_workers: Optional[int] = None) -> dict[str, str]:
+    """
+    Write the transactions of all the documents dated after `start`, up to and including `end`, to a CSV file in date
+    order. Transactions on the same date are in the order of `paths`.
+
+    Each document is loaded in another process, keeping only the transactions in the date range, and its rows are
+    spooled to a temporary file. The spooled files are then merged, so only one row of each file is held in memory.
+    The CSV is only written if every document could be loaded.
+    :return: the error message of each path which could not be loaded
+    """
+    keep = TransactionsBetween(start, end)
+    with tempfile.TemporaryDirectory(prefix='rent_manager_collate') as spool_dir:
+        spool_paths, errors = process_files(
+            spool_transactions, paths, keep, spool_dir, on_progress=on_progress, cancel=cancel, max_workers=max_workers
+        )
+        if errors or (cancel is not None and cancel.is_set()):
+            return errors
+
+        spool_files = [open(spool_path, newline='') for spool_path in spool_paths]
+        try:
+            with open(out_csv_filename, 'w') as out_csv_file:
+                out_csv = csv.writer(out_csv_file)
+                for row in heapq.merge(*map(csv.reader, spool_files), key=lambda spooled_row: spooled_row[0]):
+                    out_csv.writerow(row[1:])
+        finally:
+            for spool_file in spool_files:
+                spool_file.close()
+
+    return errors
@@ -1,23 +1,19 @@
-import csv
-import json
 import logging
 import threading
 import tkinter as tk
 import traceback
 import typing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
 from tkinter import filedialog, messagebox
-from typing import Callable, Any
+from typing import Callable, Any, Optional, Iterable
 
-import dataclass_json
 import tk_utils
-from currency import format_currency
-from rent_manager.state.all_transactions import get_all_transactions
-from rent_manager.state.other_transaction import OtherTransaction
-from rent_manager.state.rent_manager_state import RentManagerState
-from rent_manager.state.rent_payment import RentPayment
+from rent_manager import collate, document
+from rent_manager.summaries import summary_cache, DocumentSummary
 from traits.core import ViewableRecord
 from traits.views import DummyView, ListView, IntInRange
 
@@ -41,44 +37,106 @@ class RentManagerFilePath(ViewableRecord):
     @classmethod
     def from_path(cls, path: str):
         try:
-            with open(path, 'r') as f:
-                data: RentManagerState = dataclass_json.load(RentManagerState, f)
-
-        except FileNotFoundError:
-            return cls(path, 'File does not exist', False)
-        except OSError:
-            return cls(path, 'Unable to read file', False)
-        except json.JSONDecodeError:
-            return cls(path, 'Corrupt file or invalid file type', False)
+            summary = summary_cache.get(path)
+        except (OSError, *document.InvalidDocumentError) as e:
+            return cls(path, collate.load_error_message(e), False)
         else:
-            return cls.from_data(path, data)
+            return cls.from_summary(path, summary)
 
     @classmethod
-    def from_path_callback(cls, root: tk.Misc, path: str, callback: 'Callable[[RentManagerFilePath],None]'):
-        def do():
-            data = cls.from_path(path)
-            root.after_idle(lambda: callback(data))
-
-        thread = threading.Thread(target=do)
-        thread.start()
-
-    @classmethod
-    def from_data(cls, path, data: RentManagerState):
+    def from_summary(cls, path, summary: DocumentSummary):
         month_format = '%b %Y'
-        start = data.rent_arrangement_data.start_date
-        rent_payment: RentPayment
-        transaction: OtherTransaction
-        end = max(
-            max((rent_payment.received_on for rent_payment in data.rent_manager_main_state.rent_payments),
-                default=start),
-            max((transaction.date_ for transaction in data.rent_manager_main_state.other_transactions),
-                default=start)
+        return cls(
+            path,
+            f'{summary.start_date.strftime(month_format)} - {summary.last_date.strftime(month_format)}',
+            True
         )
-        return cls(path, f'{start.strftime(month_format)} - {end.strftime(month_format)}', True)
+
+
+# validating a file mostly waits on the disk, so a few threads shared by all the dialogs are enough
+file_validation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='file_validation')
+# an export waits on the processes which read the files, and the export dialog is modal, so one thread is enough
+export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+
+
+class FileValidator:
+    """
+    Validates files on `file_validation_executor`. The results are delivered on the Tk thread, in batches of those
+    which have finished, in the order that the files were requested. A file which is already being validated is not
+    validated again.
+    """
+    # milliseconds between checks for finished files
+    poll_interval = 50
+
+    def __init__(self, widget: tk.Misc):
+        self.widget = widget
+        self.in_flight: dict[str, Future[RentManagerFilePath]] = {}
+        self.requests: deque[tuple[deque[tuple[str, Future]], Callable[[list[RentManagerFilePath]], None]]] = deque()
+        self.poll_id: Optional[str] = None
+
+    def validate(self, paths: Iterable[str], deliver: Callable[[list[RentManagerFilePath]], None]) -> None:
+        futures = deque()
+        for path in paths:
+            future = self.in_flight.get(path)
+            if future is None:
+                future = self.in_flight[path] = file_validation_executor.submit(RentManagerFilePath.from_path, path)
+            futures.append((path, future))
+
+        if futures:
+            self.requests.append((futures, deliver))
+            if self.poll_id is None:
+                self.poll_id = self.widget.after(self.poll_interval, self.poll)
+
+    @staticmethod
+    def result(path: str, future: Future[RentManagerFilePath]) -> RentManagerFilePath:
+        try:
+            return future.result()
+        except Exception as e:
+            # an unexpected error, which would otherwise be raised on the Tk thread and stop the polling
+            logging.warning(f'Unable to validate {path}:\n{traceback.format_exc()}')
+            return RentManagerFilePath(path, f'{collate.load_error_message(e)}: {e}', False)
+
+    def poll(self) -> None:
+        self.poll_id = None
+        try:
+            while self.requests:
+                futures, deliver = self.requests[0]
+                batch = []
+                while futures and futures[0][1].done():
+                    path, future = futures.popleft()
+                    if self.in_flight.get(path) is future:
+                        del self.in_flight[path]
+                    batch.append(self.result(path, future))
+                if not futures:
+                    self.requests.popleft()
+                if batch:
+                    deliver(batch)
+
+                if futures:
+                    break
+        finally:
+            if self.requests and self.poll_id is None:
+                self.poll_id = self.widget.after(self.poll_interval, self.poll)
+
+    def cancel(self) -> None:
+        """
+        Stop validating the files which have not started, and deliver no more results
+        """
+        for futures, _ in self.requests:
+            for _, future in futures:
+                future.cancel()
+        self.requests.clear()
+        self.in_flight.clear()
+        if self.poll_id is not None:
+            self.widget.after_cancel(self.poll_id)
+            self.poll_id = None
 
 
 def export_collated_transactions(root, rent_manager_self):
     class FilesSelectorDialog(tk.Toplevel):
+        # milliseconds between checks for the progress of an export
+        poll_interval = 50
+
         def __init__(self):
             super().__init__(root)
             self.title('Export Collated Transactions as CSV')
@@ -121,6 +179,7 @@ def export_collated_transactions(root, rent_manager_self):
 
             tax_year()
 
+            self.file_validator = FileValidator(self)
             self.files_list, self.files_list_widget = self.make_files_widget(initial_files)
             self.files_list_widget.grid(row=1, column=0, columnspan=2, sticky=tk_utils.STICKY_ALL)
 
@@ -128,12 +187,17 @@ def export_collated_transactions(root, rent_manager_self):
             self.grid_columnconfigure(0, weight=1)
             self.grid_columnconfigure(1, weight=1)
 
-            export_button = tk.Button(self, text='Export', command=self.export)
-            export_button.grid(row=2, column=0, sticky=tk.E + tk.W)
+            self.export_button = tk.Button(self, text='Export', command=self.export)
+            self.export_button.grid(row=2, column=0, sticky=tk.E + tk.W)
             cancel_button = tk.Button(self, text='Cancel', command=self.cancel)
             cancel_button.grid(row=2, column=1, sticky=tk.E + tk.W)
             self.bind('<Escape>', lambda e: self.cancel())
 
+            self.progress = tk.Label(self)
+            self.progress.grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
+            self.cancel_export = threading.Event()
+
         def export(self):
             file_names = [file.path for file in self.files_list.get_state()]
             if not file_names:
@@ -161,18 +225,53 @@ def export_collated_transactions(root, rent_manager_self):
                 # user cancelled
                 return
 
-            files_data = []
-
             logging.info(f'Exporting collated transaction: {file_names}')
-            try:
-                for file in file_names:
-                    with open(file, 'r') as f:
-                        data = dataclass_json.load(RentManagerState, f)
-                        files_data.append(data)
 
-            except (OSError, json.JSONDecodeError):
-                logging.warning(traceback.format_exc())
+            self.export_button.config(state=tk.DISABLED)
+            self.progress.config(text=f'Loading 0 of {len(file_names)} files')
+
+            progress = (0, len(file_names))
+
+            def on_progress(loaded, total):
+                # called on the export thread, so it only records the progress for `check_done` to show
+                nonlocal progress
+                progress = (loaded, total)
 
+            # the files are read in other processes, while the export thread waits for them off the UI thread
+            future = export_executor.submit(collate.export_collated_csv, file_names, out_csv_filename,
+                                            tax_year_start_date, tax_year_end_date, on_progress, self.cancel_export)
+
+            def check_done():
+                if not future.done():
+                    loaded, total = progress
+                    self.show_progress(f'Loading {loaded} of {total} files')
+                    root.after(self.poll_interval, check_done)
+                    return
+
+                errors = {}
+                exception = future.exception()
+                if exception is None:
+                    errors = future.result()
+                else:
+                    logging.warning(''.join(traceback.format_exception(exception)))
+                self.on_export_done(file_names, errors, exception)
+
+            root.after(self.poll_interval, check_done)
+
+        def show_progress(self, text: str):
+            if self.winfo_exists():
+                self.progress.config(text=text)
+
+        def on_export_done(self, file_names: list[str], errors: dict[str, str], exception: Optional[Exception]):
+            if self.cancel_export.is_set() or not self.winfo_exists():
+                return
+
+            self.export_button.config(state=tk.NORMAL)
+            self.progress.config(text='')
+
+            if exception is not None:
+                raise exception
+            elif errors:
                 messagebox.showerror(
                     'Error',
                     'There is a problem reading some of the files. Please check that they are correct',
@@ -183,51 +282,30 @@ def export_collated_transactions(root, rent_manager_self):
 
                 self.files_list, self.files_list_widget = self.make_files_widget(file_names)
                 self.files_list_widget.grid(row=1, column=0, columnspan=2, sticky=tk_utils.STICKY_ALL)
-            except Exception:
-                logging.warning(traceback.format_exc())
-                raise
             else:
-                date_format = '%d/%m/%Y'
-
-                with open(out_csv_filename, 'w') as out_csv_file:
-                    out_csv = csv.writer(out_csv_file)
-                    for data in files_data:
-                        for transaction in get_all_transactions(data):
-                            if tax_year_start_date < transaction.date <= tax_year_end_date:
-                                out_csv.writerow(
-                                    [
-                                        transaction.date.strftime(date_format),
-                                        transaction.type,
-                                        format_currency(transaction.amount),
-                                        transaction.comment
-                                    ]
-                                )
-
                 self.destroy()
 
         def cancel(self):
             self.destroy()
 
-        @classmethod
-        def add_files(cls, file_names: list[str], add: Callable, index: int = 0):
-            if index >= len(file_names):
-                return
-
-            def add_then_next(result):
-                add(result)
-                cls.add_files(file_names, add, index + 1)
-
-            RentManagerFilePath.from_path_callback(root, file_names[index], add_then_next)
+        def destroy(self):
+            # an export still running would otherwise keep the application from exiting
+            self.cancel_export.set()
+            self.file_validator.cancel()
+            super().destroy()
 
         def make_files_widget(self, file_names):
             files_list = ListView([], editing=True)
 
-            def add_initial(initial):
+            def add_initial(batch: list[RentManagerFilePath]):
                 view = typing.cast(Any, files_list.wrapped_view)
-                view.add(initial, view.next_id)
-                view.next_id += 1
+                for initial in batch:
+                    view.add(initial, view.next_id)
+                    view.next_id += 1
 
-            self.add_files(file_names, add_initial)
+            # results for the previous list would be added to a list which is no longer shown
+            self.file_validator.cancel()
+            self.file_validator.validate(file_names, add_initial)
 
             files_list_widget = files_list(
                 self,
@@ -243,7 +321,12 @@ def export_collated_transactions(root, rent_manager_self):
                     filedialog.askopenfilenames,
                     modify_config_dir=False, parent=self
                 )
-                self.add_files(files or (), add)
+
+                def add_batch(batch: list[RentManagerFilePath]):
+                    for result in batch:
+                        add(result)
+
+                self.file_validator.validate(files or (), add_batch)
 
             add_button = tk.Button(frame, text='Add file(s)', command=add_file)
             add_button.grid(sticky=tk_utils.STICKY_ALL)
@@ -13,6 +13,7 @@ config_file = Path(rent_manager_dirs.user_data_dir) / 'config.json'
 class RentManagerConfig:
     file_chooser_dir: str = None
     accepted_license: bool = False
+    save_binary: bool = False
 
 
 def load() -> RentManagerConfig:
@@ -0,0 +1,110 @@
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, IO, Iterator, Optional
+
+import dataclass_binary
+import dataclass_json
+from .state.rent_manager_state import RentManagerState
+
+binary_magic = b'RMANBIN\x00'
+
+_umask: Optional[int] = None
+_umask_lock = threading.Lock()
+
+# JSON files larger than this are parsed one transaction at a time, as parsing them whole takes about 7 times their size
+# in memory, while smaller ones are parsed whole, which is faster
+stream_threshold = 8 << 20
+
+# the errors raised by `load` when a file is not a valid document
+InvalidDocumentError = (json.JSONDecodeError, dataclass_binary.DecodeError, UnicodeDecodeError)
+
+
+def is_binary(path: str | Path) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(binary_magic)) == binary_magic
+
+
+def load(path: str | Path, keep: Callable[[tuple[str, ...], Any], bool] = None) -> RentManagerState:
+    """
+    Load a `.rman` file in either the JSON or the binary format, which is detected from the start of the file. JSON
+    files larger than `stream_threshold`, or filtered by `keep`, are parsed one transaction at a time.
+    :param path: the file to load
+    :param keep: optionally, decides which transactions to keep (see `dataclass_json.load_stream`)
+    :return: the loaded document
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(binary_magic)) == binary_magic:
+            return dataclass_binary.load(RentManagerState, f, keep)
+
+    with open(path, 'r') as f:
+        if keep is not None or os.fstat(f.fileno()).st_size > stream_threshold:
+            return dataclass_json.load_stream(RentManagerState, f, keep)
+        return dataclass_json.load(RentManagerState, f)
+
+
+def new_file_mode() -> int:
+    """
+    :return: the permissions given to new files by `open`, rather than the private ones of `tempfile.mkstemp`
+    """
+    global _umask
+    with _umask_lock:
+        if _umask is None:
+            _umask = _read_umask()
+    return 0o666 & ~_umask
+
+
+def _read_umask() -> int:
+    # Linux shows the umask of a process in its status, which reads it without changing it
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+
+    # otherwise, it can only be read by setting it, so it is briefly 0 for any file created by another thread
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+@contextlib.contextmanager
+def atomic_open(path: str | Path, mode: str = 'w') -> Iterator[IO]:
+    """
+    Open a temporary file in the same directory as `path`, which replaces `path` once it has been written and synced.
+    A crash part way through leaves the previous version of the file intact.
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with open(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+        if path.exists():
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, new_file_mode())
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def save(state: RentManagerState, path: str | Path, binary: bool = False) -> None:
+    """
+    Save atomically (see `atomic_open`)
+    """
+    with atomic_open(path, 'wb' if binary else 'w') as f:
+        if binary:
+            f.write(binary_magic)
+            f.write(dataclass_binary.dumps(state, RentManagerState))
+        else:
+            dataclass_json.dump_stream(state, f)
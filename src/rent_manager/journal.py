@@ -0,0 +1,197 @@
+import dataclasses
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import dataclass_json
+from . import document
+from .state.rent_arrangement_data import RentArrangementData
+from .state.rent_manager_state import RentManagerState, RentManagerMainState
+
+list_fields = {field.name: field.type for field in dataclasses.fields(RentManagerMainState)}
+
+# the number of entries after which the journal is compacted into a snapshot
+compact_after = 100
+
+
+def journal_path(document_path: str | Path) -> Path:
+    document_path = Path(document_path)
+    return document_path.with_name(f'{document_path.name}.journal')
+
+
+def snapshot_path(document_path: str | Path, index: int) -> Path:
+    document_path = Path(document_path)
+    return document_path.with_name(f'{document_path.name}.snapshot{index}')
+
+
+def diff(old: RentManagerState, new: RentManagerState, fields: Iterable[str] = list_fields) -> dict:
+    """
+    Describe the change from `old` to `new`. Each list is compared from both ends, so that the entry only holds the
+    items between the unchanged prefix and the unchanged suffix.
+    :param fields: the lists which may have changed, the others are not compared
+    :return: a JSON-compatible journal entry, which is empty if nothing changed
+    """
+    entry = {}
+    if old.rent_arrangement_data != new.rent_arrangement_data:
+        entry['rent_arrangement_data'] = dataclass_json.dump_j(new.rent_arrangement_data)
+
+    changes = []
+    for name in fields:
+        old_items = getattr(old.rent_manager_main_state, name)
+        new_items = getattr(new.rent_manager_main_state, name)
+        if old_items is new_items:
+            continue
+
+        shortest = min(len(old_items), len(new_items))
+        start = 0
+        while start < shortest and old_items[start] == new_items[start]:
+            start += 1
+        end = 0
+        while end < shortest - start and old_items[-end - 1] == new_items[-end - 1]:
+            end += 1
+
+        if start + end < len(old_items) or start + end < len(new_items):
+            changes.append({
+                'field': name,
+                'start': start,
+                'stop': len(old_items) - end,
+                'items': dataclass_json.dump_j(new_items[start:len(new_items) - end])
+            })
+    if changes:
+        entry['changes'] = changes
+
+    return entry
+
+
+def apply(state: RentManagerState, entry: dict) -> RentManagerState:
+    if 'rent_arrangement_data' in entry:
+        arrangement_data = dataclass_json.load_j(entry['rent_arrangement_data'], RentArrangementData)
+        state = dataclasses.replace(state, rent_arrangement_data=arrangement_data)
+
+    main_state = state.rent_manager_main_state
+    for change in entry.get('changes', ()):
+        name = change['field']
+        items = getattr(main_state, name)
+        new_items = dataclass_json.load_j(change['items'], list_fields[name])
+        main_state = dataclasses.replace(main_state, **{
+            name: items[:change['start']] + new_items + items[change['stop']:]
+        })
+
+    return dataclasses.replace(state, rent_manager_main_state=main_state)
+
+
+class Journal:
+    """
+    An append-only log of the changes made to a document since it was last saved in full, kept next to the document.
+    Autosaving costs as much as the change, and a crash can at worst lose a partially written last entry.
+
+    Every `compact_after` entries, the journal is replaced by a snapshot of the document, so that it does not grow
+    without limit between saves. The journal then starts with a header entry naming the snapshot it continues from.
+    """
+
+    def __init__(self, document_path: str | Path, base: RentManagerState):
+        self.document_path = Path(document_path)
+        self.path = journal_path(document_path)
+        self.state = base
+        self.snapshot_index: Optional[int] = read_header(self.path)
+        self.entries = 0
+        # fields which changed in an entry which could not be written
+        self.pending_fields: set[str] = set()
+
+    def append(self, state: RentManagerState, fields: Iterable[str] = list_fields) -> None:
+        """
+        :param fields: the lists which changed since the last entry, as seen from the undo manager's actions
+        """
+        self.pending_fields.update(fields)
+        entry = diff(self.state, state, self.pending_fields)
+        if entry:
+            with self.path.open('a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries += 1
+        self.state = state
+        self.pending_fields.clear()
+
+        if self.entries >= compact_after:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Write the current state to a snapshot, then replace the journal with one which continues from it. The previous
+        snapshot stays in use until the new journal is in place.
+        """
+        index = 1 if self.snapshot_index == 0 else 0
+        document.save(self.state, snapshot_path(self.document_path, index), binary=True)
+        with document.atomic_open(self.path) as f:
+            f.write(json.dumps({'snapshot': index}) + '\n')
+        if self.snapshot_index is not None:
+            snapshot_path(self.document_path, self.snapshot_index).unlink(missing_ok=True)
+
+        self.snapshot_index = index
+        self.entries = 0
+
+    def reset(self, base: RentManagerState) -> None:
+        """
+        Empty the journal, after `base` has been saved in full
+        """
+        discard(self.document_path)
+        self.state = base
+        self.snapshot_index = None
+        self.entries = 0
+        self.pending_fields.clear()
+
+
+def read_header(path: Path) -> Optional[int]:
+    """
+    :return: the index of the snapshot which the journal at `path` continues from, if any
+    """
+    try:
+        with path.open() as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return None
+    try:
+        return json.loads(first_line).get('snapshot')
+    except json.JSONDecodeError:
+        return None
+
+
+def has_entries(document_path: str | Path) -> bool:
+    path = journal_path(document_path)
+    return path.exists() and path.stat().st_size > 0
+
+
+def recover(document_path: str | Path) -> RentManagerState:
+    """
+    Load the document, or the snapshot the journal continues from, then replay the journal. An entry which cannot be
+    read, from a crash part way through writing it, ends the replay.
+    """
+    path = journal_path(document_path)
+    snapshot_index = read_header(path)
+    if snapshot_index is None:
+        state = document.load(document_path)
+    else:
+        state = document.load(snapshot_path(document_path, snapshot_index))
+
+    with path.open() as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f'Ignoring incomplete journal entry for {document_path}')
+                break
+            if 'snapshot' not in entry:
+                state = apply(state, entry)
+    return state
+
+
+def discard(document_path: str | Path) -> None:
+    """
+    Remove the journal of a document, and its snapshots
+    """
+    journal_path(document_path).unlink(missing_ok=True)
+    for index in (0, 1):
+        snapshot_path(document_path, index).unlink(missing_ok=True)
@@ -1,7 +1,10 @@
 import abc
+import bisect
+import functools
+import heapq
 import operator
-import typing
 from datetime import date
+from typing import Iterator, Optional
 
 from .other_transaction import OtherTransaction
 from .rent_manager_state import RentManagerState
@@ -9,6 +12,12 @@ from .rent_payment import RentPayment
 
 
 class AnyTransaction(abc.ABC):
+    """
+    A lightweight, slotted view of a rent payment or other transaction. `date` doubles as the sort key, so it is read
+    from the wrapped transaction once, when the view is created.
+    """
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def date(self) -> date:
@@ -35,13 +44,11 @@ class AnyTransaction(abc.ABC):
 
 
 class AnyTransactionOther(AnyTransaction):
+    __slots__ = ('inner', 'date')
+
     def __init__(self, inner: OtherTransaction) -> None:
-        super().__init__()
         self.inner: OtherTransaction = inner
-
-    @property
-    def date(self) -> date:
-        return self.inner.date_
+        self.date: date = inner.date_
 
     @property
     def type(self) -> str:
@@ -59,14 +66,19 @@ class AnyTransactionOther(AnyTransaction):
         return self.inner
 
 
+@functools.lru_cache(maxsize=1024)
+def rent_comment(for_month: date) -> str:
+    month_format = '%b %Y'
+    return f'For month {for_month.strftime(month_format)}'
+
+
 class AnyTransactionRent(AnyTransaction):
+    __slots__ = ('inner', 'date', '_comment')
+
     def __init__(self, inner: RentPayment) -> None:
-        super().__init__()
         self.inner: RentPayment = inner
-
-    @property
-    def date(self) -> date:
-        return self.inner.received_on
+        self.date: date = inner.received_on
+        self._comment: Optional[str] = None
 
     @property
     def type(self) -> str:
@@ -78,25 +90,47 @@ class AnyTransactionRent(AnyTransaction):
 
     @property
     def comment(self) -> str:
-        month_format = '%b %Y'
-        return f'For month {self.inner.for_month.strftime(month_format)}'
+        if self._comment is None:
+            self._comment = rent_comment(self.inner.for_month)
+        return self._comment
 
     def unwrap(self):
         return self.inner
 
 
-def get_all_transactions(data: RentManagerState) -> list[AnyTransaction]:
+def iter_all_transactions(data: RentManagerState, since: Optional[date] = None,
+                          transactions_by_date: Optional[tuple[list[RentPayment], list[OtherTransaction]]] = None
+                          ) -> Iterator[AnyTransaction]:
     """
-    Get both rent and other transactions in a unified list of `AnyTransaction`s
+    Iterate over both rent and other transactions as `AnyTransaction`s, ordered by date. Transactions on the same date
+    keep their list order, with rent payments first.
     :param data: The rent manager state
-    :return: the combined list of all transactions
+    :param since: if given, only the transactions on or after this date, which are found by bisecting
+    :param transactions_by_date: the date ordered transactions of `data`, if already known, otherwise they are sorted
+    :return: an iterator lazily merging the date ordered rent payments and other transactions
     """
-    return sorted(
-        [typing.cast(AnyTransaction, AnyTransactionRent(rent_payment)) for rent_payment in
-         data.rent_manager_main_state.rent_payments]
-        +
-        [AnyTransactionOther(other_transaction)
-         for other_transaction in data.rent_manager_main_state.other_transactions]
-        ,
+    if transactions_by_date is None:
+        transactions_by_date = data.rent_manager_main_state.transactions_by_date()
+    rent_payments, other_transactions = transactions_by_date
+    if since is not None:
+        rent_payments = rent_payments[
+            bisect.bisect_left(rent_payments, since, key=operator.attrgetter('received_on')):
+        ]
+        other_transactions = other_transactions[
+            bisect.bisect_left(other_transactions, since, key=operator.attrgetter('date_')):
+        ]
+    return heapq.merge(
+        map(AnyTransactionRent, rent_payments),
+        map(AnyTransactionOther, other_transactions),
         key=operator.attrgetter('date')
     )
+
+
+def get_all_transactions(data: RentManagerState) -> list[AnyTransaction]:
+    """
+    Get both rent and other transactions in a unified list of `AnyTransaction`s, ordered by date (see
+    `iter_all_transactions`)
+    :param data: The rent manager state
+    :return: the list of transactions
+    """
+    return list(iter_all_transactions(data))
@@ -0,0 +1,75 @@
+import logging
+from datetime import date
+from typing import Sequence
+
+from .other_transaction import OtherTransaction, TransactionReason
+from .rent_payment import RentPayment
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+
+reasons = list(TransactionReason)
+reason_codes = {reason: code for code, reason in enumerate(reasons)}
+
+
+def month_number(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def rent_payment_columns(rent_payments: Sequence[RentPayment]) -> 'tuple[np.ndarray, np.ndarray, np.ndarray]':
+    """
+    :return: the amounts, month numbers (see `month_number`) of `for_month` and day of month of `for_month`
+    """
+    count = len(rent_payments)
+    amounts = np.fromiter((rent_payment.amount for rent_payment in rent_payments), dtype=np.int64, count=count)
+    months = np.fromiter((month_number(rent_payment.for_month) for rent_payment in rent_payments),
+                         dtype=np.int64, count=count)
+    days = np.fromiter((rent_payment.for_month.day for rent_payment in rent_payments), dtype=np.int64, count=count)
+    return amounts, months, days
+
+
+def other_transaction_columns(other_transactions: Sequence[OtherTransaction]) \
+        -> 'tuple[np.ndarray, np.ndarray, np.ndarray]':
+    """
+    :return: the amounts, day numbers (`date.toordinal`) and reason codes (see `reason_codes`)
+    """
+    count = len(other_transactions)
+    amounts = np.fromiter((transaction.amount for transaction in other_transactions), dtype=np.int64, count=count)
+    dates = np.fromiter((transaction.date_.toordinal() for transaction in other_transactions),
+                        dtype=np.int64, count=count)
+    codes = np.fromiter((reason_codes[transaction.reason] for transaction in other_transactions),
+                        dtype=np.int64, count=count)
+    return amounts, dates, codes
+
+
+def rent_for_months(start_date: date, months_since_start: int, rent_payments: Sequence[RentPayment]) \
+        -> list[tuple[date, int]]:
+    # there are no months in the rental period before it starts
+    months_since_start = max(months_since_start, 0)
+    amounts, months, days = rent_payment_columns(rent_payments)
+
+    month_indices = months - month_number(start_date)
+    in_period = (month_indices >= 0) & (month_indices < months_since_start) & (days == 1)
+    for i in np.flatnonzero(~in_period):
+        logging.warning(
+            f'{rent_payments[i].for_month} is not a month in the rental period {start_date} to {date.today()}'
+        )
+
+    # weights are summed as float64, which is exact for any realistic total of pence
+    paid = np.bincount(month_indices[in_period], weights=amounts[in_period], minlength=months_since_start)
+
+    first_month = month_number(start_date)
+    return [
+        (date((first_month + month) // 12, (first_month + month) % 12 + 1, 1), int(paid[month]))
+        for month in range(months_since_start)
+    ]
+
+
+def other_transaction_sums(other_transactions: Sequence[OtherTransaction]) -> dict[TransactionReason, int]:
+    amounts, _dates, codes = other_transaction_columns(other_transactions)
+    sums = np.bincount(codes, weights=amounts, minlength=len(reasons))
+    return {reason: int(sums[code]) for code, reason in enumerate(reasons)}
@@ -1,13 +1,26 @@
+import bisect
+import enum
 import logging
 from dataclasses import dataclass
 from datetime import date
+from typing import Iterable, Optional, Sequence
 
-from rent_manager.state.all_transactions import get_all_transactions, AnyTransaction
+from rent_manager.state import columnar
+from rent_manager.state.all_transactions import iter_all_transactions, AnyTransaction
 from rent_manager.state.other_transaction import OtherTransaction, TransactionReason
-from rent_manager.state.rent_manager_state import RentManagerState
+from rent_manager.state.rent_arrangement_data import RentArrangementData
+from rent_manager.state.rent_manager_state import RentManagerState, RentManagerMainState
 from rent_manager.state.rent_payment import RentPayment
 
 
+class CalculationBackend(enum.Enum):
+    Python = enum.auto()
+    NumPy = enum.auto()
+
+
+default_backend = CalculationBackend.Python
+
+
 @dataclass
 class BalanceAnnotatedTransaction:
     inner: AnyTransaction
@@ -15,6 +28,114 @@ class BalanceAnnotatedTransaction:
     current_float: int
 
 
+def months_since_start(start_date: date) -> int:
+    """
+    :return: the number of months of the rental period up to today, including the month under way
+    """
+    months = date.today().month - start_date.month + 12 * (date.today().year - start_date.year)
+    if date.today().day >= start_date.day:
+        months += 1
+    return months
+
+
+def add_rent_for_months(rent_for_months: dict[date, int], start_date: date, rent_payments: Iterable[RentPayment],
+                        sign: int = 1):
+    """
+    Add rent payments to the rent of the months they are for, or take them away again with a `sign` of -1. A payment
+    for a month outside the rental period is left out, with a warning as it is added.
+    """
+    for rent_payment in rent_payments:
+        try:
+            rent_for_months[rent_payment.for_month] += sign * rent_payment.amount
+        except KeyError:
+            if sign > 0:
+                logging.warning(
+                    f'{rent_payment.for_month} is not a month in the rental period {start_date} to {date.today()}'
+                )
+
+
+def python_rent_for_months(start_date: date, months_since_start: int, rent_payments: Iterable[RentPayment]) \
+        -> list[tuple[date, int]]:
+    rent_for_months = {
+        date(
+            start_date.year + (start_date.month + month - 1) // 12,
+            (start_date.month + month - 1) % 12 + 1,
+            1
+        ): 0
+        for month in range(months_since_start)
+    }
+    add_rent_for_months(rent_for_months, start_date, rent_payments)
+    return list(rent_for_months.items())
+
+
+def add_other_transaction_sums(other_transaction_sums: dict[TransactionReason, int],
+                               other_transactions: Iterable[OtherTransaction], sign: int = 1):
+    for transaction in other_transactions:
+        other_transaction_sums[transaction.reason] += sign * transaction.amount
+
+
+def python_other_transaction_sums(other_transactions: Iterable[OtherTransaction]) -> dict[TransactionReason, int]:
+    other_transaction_sums = {reason: 0 for reason in TransactionReason}
+    add_other_transaction_sums(other_transaction_sums, other_transactions)
+    return other_transaction_sums
+
+
+def apply_transaction(transaction: RentPayment | OtherTransaction, balance: int, float_: int, base_float: int) \
+        -> tuple[int, int]:
+    match transaction:
+        case RentPayment(amount=amount):
+            balance += amount
+        case OtherTransaction(reason=TransactionReason.FloatIncrease, amount=amount):
+            balance -= amount
+            float_ += amount
+        case OtherTransaction(reason=TransactionReason.Cost, amount=amount):
+            surplus_float = float_ - base_float
+            if surplus_float > 0:
+                payable_out_of_float = min(amount, surplus_float)
+                float_ -= payable_out_of_float
+                amount -= payable_out_of_float
+
+            if balance > 0:
+                payable_out_of_balance = min(amount, balance)
+                balance -= payable_out_of_balance
+                amount -= payable_out_of_balance
+
+            if float_ > 0:
+                payable_out_of_float = min(amount, float_)
+                float_ -= payable_out_of_float
+                amount -= payable_out_of_float
+
+            balance -= amount
+        case OtherTransaction(amount=amount):
+            balance -= amount
+        case _:
+            logging.warning(f'Expected RentPayment or OtherTransaction, not {transaction}.')
+    return balance, float_
+
+
+def annotate_balances(transactions: Iterable[AnyTransaction], arrangement_data: RentArrangementData,
+                      previous: Sequence[BalanceAnnotatedTransaction] = ()) -> list[BalanceAnnotatedTransaction]:
+    """
+    Run the balance/float state machine over date-ordered transactions
+    :param transactions: the transactions in date order, following those of `previous`
+    :param arrangement_data: the rent arrangements, which `previous` was calculated with
+    :param previous: balance annotated transactions from a previous run, whose balance and float are continued from
+    :return: `previous`, then each transaction annotated with the balance and float after it
+    """
+    balance_annotated_transactions = list(previous)
+
+    if previous:
+        balance, float_ = previous[-1].current_balance, previous[-1].current_float
+    else:
+        balance, float_ = arrangement_data.initial_balance, arrangement_data.initial_float
+    for wrapped_transaction in transactions:
+        transaction: RentPayment | OtherTransaction = wrapped_transaction.unwrap()
+        balance, float_ = apply_transaction(transaction, balance, float_, arrangement_data.base_float)
+        balance_annotated_transactions.append(BalanceAnnotatedTransaction(wrapped_transaction, balance, float_))
+
+    return balance_annotated_transactions
+
+
 @dataclass(frozen=True)
 class RentCalculations:
     rent_manager_state: RentManagerState
@@ -27,82 +148,51 @@ class RentCalculations:
     balance_annotated_transactions: list[BalanceAnnotatedTransaction]
 
     @classmethod
-    def from_rent_manager_state(cls, rent_manager_state: RentManagerState):
+    def from_rent_manager_state(cls, rent_manager_state: RentManagerState,
+                                backend: 'Optional[CalculationBackend]' = None,
+                                transactions_by_date: Optional[tuple[list[RentPayment], list[OtherTransaction]]] = None):
+        """
+        Calculate everything from scratch
+        :param rent_manager_state: The rent manager state
+        :param backend: how to calculate the monthly rent and per-reason sums, defaulting to `default_backend`
+        :param transactions_by_date: the date ordered transactions, if already known (see `iter_all_transactions`)
+        :return: the calculations
+        """
         start_date = rent_manager_state.rent_arrangement_data.start_date
-        months_since_start = date.today().month - start_date.month + 12 * (date.today().year - start_date.year)
-        if date.today().day >= start_date.day:
-            months_since_start += 1
-        rent_for_months = {
-            date(
-                start_date.year + (start_date.month + month - 1) // 12,
-                (start_date.month + month - 1) % 12 + 1,
-                1
-            ): 0
-            for month in range(months_since_start)
-        }
-
-        for rent_payment in rent_manager_state.rent_manager_main_state.rent_payments:
-            try:
-                rent_for_months[rent_payment.for_month] += rent_payment.amount
-            except KeyError:
-                logging.warning(
-                    f'{rent_payment.for_month} is not a month in the rental period {start_date} to {date.today()}'
-                )
+        months = months_since_start(start_date)
+        if backend is None:
+            backend = default_backend
+        if backend is CalculationBackend.NumPy and not columnar.available:
+            logging.warning('NumPy is not installed, so the Python calculation backend will be used instead')
+            backend = CalculationBackend.Python
+        if backend is CalculationBackend.NumPy:
+            month_sums, transaction_sums = columnar.rent_for_months, columnar.other_transaction_sums
+        else:
+            month_sums, transaction_sums = python_rent_for_months, python_other_transaction_sums
+
+        rent_for_months = month_sums(start_date, months,
+                                     rent_manager_state.rent_manager_main_state.rent_payments)
 
         total_rent_received = sum(
             rent_payment.amount
             for rent_payment in rent_manager_state.rent_manager_main_state.rent_payments
         )
-        total_rent_due = months_since_start * rent_manager_state.rent_arrangement_data.monthly_rent
+        total_rent_due = months * rent_manager_state.rent_arrangement_data.monthly_rent
         total_commission_due = int(total_rent_received * rent_manager_state.rent_arrangement_data.agents_fee / 100)
-        other_transaction_sums = {
-            reason: sum(
-                transaction.amount
-                for transaction in rent_manager_state.rent_manager_main_state.other_transactions
-                if transaction.reason is reason
-            )
-            for reason in TransactionReason
-        }
-
-        balance_annotated_transactions = []
-
-        float_ = rent_manager_state.rent_arrangement_data.initial_float
-        balance = rent_manager_state.rent_arrangement_data.initial_balance
-        for wrapped_transaction in get_all_transactions(rent_manager_state):
-            transaction: RentPayment | OtherTransaction = wrapped_transaction.unwrap()
-            match transaction:
-                case RentPayment(amount=amount):
-                    balance += amount
-                case OtherTransaction(reason=TransactionReason.FloatIncrease, amount=amount):
-                    balance -= amount
-                    float_ += amount
-                case OtherTransaction(reason=TransactionReason.Cost, amount=amount):
-                    surplus_float = float_ - rent_manager_state.rent_arrangement_data.base_float
-                    if surplus_float > 0:
-                        payable_out_of_float = min(amount, surplus_float)
-                        float_ -= payable_out_of_float
-                        amount -= payable_out_of_float
-
-                    if balance > 0:
-                        payable_out_of_balance = min(amount, balance)
-                        balance -= payable_out_of_balance
-                        amount -= payable_out_of_balance
-
-                    if float_ > 0:
-                        payable_out_of_float = min(amount, float_)
-                        float_ -= payable_out_of_float
-                        amount -= payable_out_of_float
-
-                    balance -= amount
-                case OtherTransaction(amount=amount):
-                    balance -= amount
-                case _:
-                    logging.warning(f'Expected RentPayment or OtherTransaction, not {transaction}.')
-            balance_annotated_transactions.append(BalanceAnnotatedTransaction(wrapped_transaction, balance, float_))
+        other_transaction_sums = transaction_sums(rent_manager_state.rent_manager_main_state.other_transactions)
+
+        balance_annotated_transactions = annotate_balances(
+            iter_all_transactions(rent_manager_state, transactions_by_date=transactions_by_date),
+            rent_manager_state.rent_arrangement_data
+        )
+        if balance_annotated_transactions:
+            float_ = balance_annotated_transactions[-1].current_float
+        else:
+            float_ = rent_manager_state.rent_arrangement_data.initial_float
 
         return cls(
             rent_manager_state=rent_manager_state,
-            rent_for_months=list(rent_for_months.items()),
+            rent_for_months=rent_for_months,
             unclaimed_commission=total_commission_due - other_transaction_sums[TransactionReason.AgentFee],
             total_rent_due=total_rent_due,
             total_rent_received=total_rent_received,
@@ -125,3 +215,113 @@ class RentCalculations:
     @property
     def total_costs(self):
         return sum(self.other_transaction_sums.values())
+
+
+@dataclass(frozen=True)
+class ChangedPositions:
+    """
+    The position in each list of the first transaction which may have been added, removed, moved or changed since the
+    previous calculation, or None where a list is unchanged. The transactions before it are the same, in the same order.
+    """
+    rent_payments: Optional[int] = 0
+    other_transactions: Optional[int] = 0
+
+
+class IncrementalRentCalculations:
+    """
+    Updates the previous calculation from the positions of the changed transactions, which the list views track as they
+    are edited. The sums are adjusted by the transactions from those positions on, and the balance and float are only
+    replayed from the earliest date among them, so an edit near the end of the lists costs little however long they are.
+    """
+
+    def __init__(self):
+        self.rent_arrangement_data: Optional[RentArrangementData] = None
+        self.main_state: Optional[RentManagerMainState] = None
+        # the date ordered transactions of `main_state`, carried forward from the positions the list views report
+        self.transactions_by_date: Optional[tuple[list[RentPayment], list[OtherTransaction]]] = None
+        self.months_since_start: Optional[int] = None
+        self.results: Optional[RentCalculations] = None
+
+    def calculate(self, rent_manager_state: RentManagerState,
+                  changed: Optional[ChangedPositions] = None) -> RentCalculations:
+        """
+        :param changed: where the transactions have changed since the previous calculation, otherwise everything is
+        calculated from scratch
+        """
+        months = months_since_start(rent_manager_state.rent_arrangement_data.start_date)
+        if (changed is None or self.results is None or self.months_since_start != months
+                or self.rent_arrangement_data != rent_manager_state.rent_arrangement_data):
+            self.transactions_by_date = rent_manager_state.rent_manager_main_state.transactions_by_date()
+            self.results = RentCalculations.from_rent_manager_state(rent_manager_state,
+                                                                    transactions_by_date=self.transactions_by_date)
+        else:
+            self.results = self.update(rent_manager_state, changed)
+
+        self.rent_arrangement_data = rent_manager_state.rent_arrangement_data
+        self.main_state = rent_manager_state.rent_manager_main_state
+        self.months_since_start = months
+        return self.results
+
+    def update(self, rent_manager_state: RentManagerState, changed: ChangedPositions) -> RentCalculations:
+        previous, previous_main_state = self.results, self.main_state
+        main_state = rent_manager_state.rent_manager_main_state
+        arrangement = rent_manager_state.rent_arrangement_data
+
+        def tails(items: list, first_changed: Optional[int]) -> list:
+            return [] if first_changed is None else items[first_changed:]
+
+        old_rent_payments = tails(previous_main_state.rent_payments, changed.rent_payments)
+        new_rent_payments = tails(main_state.rent_payments, changed.rent_payments)
+        old_other_transactions = tails(previous_main_state.other_transactions, changed.other_transactions)
+        new_other_transactions = tails(main_state.other_transactions, changed.other_transactions)
+
+        rent_for_months = dict(previous.rent_for_months)
+        add_rent_for_months(rent_for_months, arrangement.start_date, old_rent_payments, -1)
+        add_rent_for_months(rent_for_months, arrangement.start_date, new_rent_payments)
+        total_rent_received = (previous.total_rent_received
+                               - sum(rent_payment.amount for rent_payment in old_rent_payments)
+                               + sum(rent_payment.amount for rent_payment in new_rent_payments))
+        total_commission_due = int(total_rent_received * arrangement.agents_fee / 100)
+        other_transaction_sums = dict(previous.other_transaction_sums)
+        add_other_transaction_sums(other_transaction_sums, old_other_transactions, -1)
+        add_other_transaction_sums(other_transaction_sums, new_other_transactions)
+
+        # the transactions dated before every changed one are the same, in the same order, so their balances are kept
+        self.transactions_by_date = main_state.carry_transactions_by_date(
+            previous_main_state, self.transactions_by_date, changed.rent_payments, changed.other_transactions
+        )
+        changed_dates = [rent_payment.received_on for rent_payment in old_rent_payments + new_rent_payments] + \
+                        [transaction.date_ for transaction in old_other_transactions + new_other_transactions]
+        if changed_dates:
+            since = min(changed_dates)
+            kept = bisect.bisect_left(previous.balance_annotated_transactions, since,
+                                      key=lambda annotated: annotated.inner.date)
+            balance_annotated_transactions = annotate_balances(
+                iter_all_transactions(rent_manager_state, since, self.transactions_by_date),
+                arrangement,
+                previous.balance_annotated_transactions[:kept]
+            )
+        else:
+            balance_annotated_transactions = previous.balance_annotated_transactions
+        if balance_annotated_transactions:
+            float_ = balance_annotated_transactions[-1].current_float
+        else:
+            float_ = arrangement.initial_float
+
+        return RentCalculations(
+            rent_manager_state=rent_manager_state,
+            rent_for_months=list(rent_for_months.items()),
+            unclaimed_commission=total_commission_due - other_transaction_sums[TransactionReason.AgentFee],
+            total_rent_due=previous.total_rent_due,
+            total_rent_received=total_rent_received,
+            other_transaction_sums=other_transaction_sums,
+            float_=float_,
+            balance_annotated_transactions=balance_annotated_transactions
+        )
+
+    def reset(self):
+        self.rent_arrangement_data = None
+        self.main_state = None
+        self.transactions_by_date = None
+        self.months_since_start = None
+        self.results = None
@@ -1,10 +1,7 @@
-import tkinter as tk
 from dataclasses import dataclass
 from datetime import date
 
-from tk_utils import Spacer
-from traits.header import HasHeader
-from traits.views import CurrencyView, DateView, MonthView
+from traits.record import HasHeader, ConfiguredIn
 
 
 @dataclass
@@ -17,13 +14,4 @@ class RentPayment(HasHeader):
     received_on: date
     for_month: date
 
-    @staticmethod
-    def configure(parent: tk.Frame, amount: CurrencyView, received_on: DateView, for_month: MonthView):
-        amount(parent).grid(padx=8)
-        Spacer(parent).grid(row=0, column=1)
-        for_month(parent).grid(row=0, column=2, padx=8)
-        Spacer(parent).grid(row=0, column=3)
-        received_on(parent).grid(row=0, column=4, padx=8)
-        parent.grid_columnconfigure(0, weight=1, uniform='rent_payment')
-        parent.grid_columnconfigure(2, weight=2, uniform='rent_payment')
-        parent.grid_columnconfigure(4, weight=3, uniform='rent_payment')
+    configure = ConfiguredIn('rent_manager.views.rent_payment')
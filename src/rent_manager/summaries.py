@@ -0,0 +1,160 @@
+import atexit
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import dataclass_json
+from . import document
+from .config import rent_manager_dirs
+from .state.rent_manager_state import RentManagerState
+
+cache_file = Path(rent_manager_dirs.user_cache_dir) / 'summaries.json'
+
+# the number of files remembered, the least recently used are forgotten first
+max_entries = 5000
+# changes are written together, at most this many seconds after the first
+write_delay = 1
+
+
+@dataclass
+class DocumentSummary:
+    start_date: date
+    last_date: date
+    rent_payments: int
+    other_transactions: int
+
+
+@dataclass
+class CachedSummary:
+    path: str
+    modified_ns: int
+    size: int
+    # the SHA-256 of the file, which is compared only once the modification time has changed while the size has not
+    content_hash: str
+    summary: DocumentSummary
+
+
+def summarise(state: RentManagerState) -> DocumentSummary:
+    main_state = state.rent_manager_main_state
+    start = state.rent_arrangement_data.start_date
+    return DocumentSummary(
+        start,
+        max(
+            max((rent_payment.received_on for rent_payment in main_state.rent_payments), default=start),
+            max((transaction.date_ for transaction in main_state.other_transactions), default=start)
+        ),
+        len(main_state.rent_payments),
+        len(main_state.other_transactions)
+    )
+
+
+def content_hash(path: str | Path) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 16):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class SummaryCache:
+    """
+    Summaries of documents, kept between runs so that listing a file does not need it to be parsed. A summary is used
+    while the file's modification time and size are unchanged. Otherwise, if the file's size and content are unchanged
+    the summary is still used, and only when they have changed too is the file parsed again.
+    """
+
+    def __init__(self, path: Path = cache_file):
+        self.path = path
+        self.lock = threading.Lock()
+        self._entries: Optional[dict[str, CachedSummary]] = None
+        self.write_timer: Optional[threading.Timer] = None
+
+    @property
+    def entries(self) -> dict[str, CachedSummary]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with self.path.open() as f:
+                    for entry in dataclass_json.load(list[CachedSummary], f):
+                        self._entries[entry.path] = entry
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, TypeError):
+                logging.warning(f'Ignoring unreadable summary cache {self.path}')
+        return self._entries
+
+    def get(self, path: str | Path) -> DocumentSummary:
+        """
+        :raise OSError, document.InvalidDocumentError: if the file has to be parsed, and cannot be
+        """
+        key = str(Path(path).resolve())
+        stat = os.stat(key)
+        with self.lock:
+            cached = self.entries.pop(key, None)
+            if cached is not None:
+                self.entries[key] = cached
+        if cached is not None and (cached.modified_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+            return cached.summary
+
+        file_hash = None
+        if cached is not None and cached.content_hash and cached.size == stat.st_size:
+            file_hash = content_hash(key)
+        if file_hash is not None and cached.content_hash == file_hash:
+            summary = cached.summary
+        else:
+            summary = summarise(document.load(key))
+        self.put(key, stat, file_hash or content_hash(key), summary)
+        return summary
+
+    def record(self, path: str | Path, state: RentManagerState) -> None:
+        """
+        Remember the summary of a document which has just been saved
+        """
+        key = str(Path(path).resolve())
+        self.put(key, os.stat(key), content_hash(key), summarise(state))
+
+    def put(self, key: str, stat: os.stat_result, file_hash: str, summary: DocumentSummary) -> None:
+        with self.lock:
+            entries = self.entries
+            entries.pop(key, None)
+            entries[key] = CachedSummary(key, stat.st_mtime_ns, stat.st_size, file_hash, summary)
+            while len(entries) > max_entries:
+                del entries[next(iter(entries))]
+
+            if self.write_timer is None:
+                self.write_timer = threading.Timer(write_delay, self.write)
+                self.write_timer.daemon = True
+                self.write_timer.start()
+
+    def flush(self) -> None:
+        """
+        Write the changes now, rather than after `write_delay`, such as before the program exits
+        """
+        with self.lock:
+            write_timer = self.write_timer
+        if write_timer is not None:
+            write_timer.cancel()
+            self.write()
+
+    def write(self) -> None:
+        with self.lock:
+            self.write_timer = None
+            to_write = list(self.entries.values())
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with document.atomic_open(self.path) as f:
+                dataclass_json.dump(to_write, f)
+        except OSError:
+            logging.warning(f'Unable to write summary cache {self.path}')
+
+
+summary_cache = SummaryCache()
+# the timer writing the changes is a daemon thread, so it would not keep the program running until it has
+atexit.register(summary_cache.flush)
+
@@ -1,11 +1,22 @@
+import bisect
+import hashlib
+import io
 import itertools
 import re
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
 from pathlib import Path
-from typing import Sequence
+from typing import Sequence, Optional, Callable, Any, Iterable
 from xml.sax.saxutils import escape
 
 # noinspection PyPackageRequirements
 from fpdf import FPDF, HTMLMixin
+# noinspection PyPackageRequirements
+from fpdf.outline import OutlineSection
+# noinspection PyPackageRequirements
+from fpdf.syntax import DestinationXYZ
 
 from currency import format_currency
 from rent_manager.state.all_transactions import AnyTransaction
@@ -18,6 +29,47 @@ class PDF(FPDF, HTMLMixin):
     pass
 
 
+class PageSpool(dict):
+    """
+    A replacement for `FPDF.pages` which keeps only the page being drawn in memory. When a page is added, the content of
+    the page before it is written to a temporary file, and it is read back when it is output.
+
+    Changes to a page returned for a page which has been spooled are not kept, so the `{nb}` page count alias, which
+    replaces the content of each page, is not supported.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.file = tempfile.TemporaryFile()
+        # the offset and length in `file` of the content of each page which has been spooled
+        self.spooled: dict[int, tuple[int, int]] = {}
+        self.current: Optional[int] = None
+
+    def __setitem__(self, number: int, page: dict):
+        if self.current is not None and self.current != number:
+            self.spool(self.current)
+        super().__setitem__(number, page)
+        self.current = number
+
+    def __getitem__(self, number: int) -> dict:
+        page = super().__getitem__(number)
+        if number in self.spooled:
+            offset, length = self.spooled[number]
+            self.file.seek(offset)
+            page = dict(page, content=self.file.read(length))
+        return page
+
+    def spool(self, number: int):
+        page = super().__getitem__(number)
+        offset = self.file.seek(0, io.SEEK_END)
+        self.file.write(page['content'])
+        self.spooled[number] = offset, len(page['content'])
+        super().__setitem__(number, dict(page, content=None))
+
+    def close(self):
+        self.file.close()
+
+
 def hello_world():
     gen = PDFGenerator()
     data = [[str(i), f'{i**2=}', ' ' + 'a' * i] for i in range(5)]
@@ -25,13 +77,83 @@ def hello_world():
     gen.output('hello_world.pdf')
 
 
+@dataclass
+class LaidOutSection:
+    """
+    The pages of a section as laid out by a `PDFGenerator`, which can be put in another. The fonts of every generator
+    are numbered the same, so the pages can be copied as they are.
+    """
+    pages: list[dict]
+    # the section's entries in the document outline, with page numbers counted from the section's first page
+    outline: list[OutlineSection]
+
+    @property
+    def size(self) -> int:
+        return sum(len(page['content']) for page in self.pages)
+
+
+class SectionCache:
+    """
+    Laid out pages of report sections, by a hash of what the section shows. The least recently used sections are
+    forgotten first, once there are more than `max_sections`, or their pages' content is larger than `max_bytes`.
+    """
+
+    def __init__(self, max_sections: int = 256, max_bytes: int = 64 << 20):
+        self.max_sections = max_sections
+        self.max_bytes = max_bytes
+        self.sections: OrderedDict[bytes, LaidOutSection] = OrderedDict()
+        self.size = 0
+
+    def get(self, section_hash: bytes) -> Optional[LaidOutSection]:
+        section = self.sections.get(section_hash)
+        if section is not None:
+            self.sections.move_to_end(section_hash)
+        return section
+
+    def put(self, section_hash: bytes, section: LaidOutSection):
+        if section.size > self.max_bytes:
+            return
+
+        self.sections[section_hash] = section
+        self.size += section.size
+        while len(self.sections) > self.max_sections or self.size > self.max_bytes:
+            _, forgotten = self.sections.popitem(last=False)
+            self.size -= forgotten.size
+
+    def clear(self):
+        self.sections.clear()
+        self.size = 0
+
+
+section_cache = SectionCache()
+
+# the height of a table's rows, relative to the font size
+table_row_spacing = 1.3
+table_header_color = (0xd8, 0xe1, 0xed)
+# alternate rows of a table are shaded, so that a row can be followed across the page
+table_row_colors = ((0xff, 0xff, 0xff), (0xe9, 0xee, 0xf5))
+
+
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, streaming: bool = False):
+        """
+        :param streaming: whether to write completed pages to a temporary file rather than keeping them in memory until
+        the PDF is output, so that the memory used does not grow with the number of pages
+        """
         self.pdf = PDF()
-        self.pdf.add_page()
-        self.pdf.set_font('helvetica', size=12)
+        if streaming:
+            self.pdf.pages = PageSpool()
+            self.pdf.alias_nb_pages('')
+        # fonts are numbered in the order they are first used, so they are all added up front to keep the numbers
+        # the same in cached pages
+        for style in ('B', 'I', 'BI', ''):
+            self.pdf.set_font('helvetica', style, size=12)
 
         self.html_buffer = []
+        # memoized widths of text, by font family, style, size and text
+        self.string_widths: dict[tuple[str, str, float, str], float] = {}
+        # whether the next HTML starts a new page, rather than following what is on the current page
+        self.new_page = True
 
     def put(self, html_fragment):
         self.html_buffer.append(html_fragment)
@@ -42,42 +164,171 @@ class PDFGenerator:
     def tag(self, tag_name: str, **attributes: str):
         return AutoClosingTag(self, tag_name, **attributes)
 
-    def put_table(self, headers: Sequence[str | tuple[str, float]], data):
-        with self.tag('table', border='1'):
-            # noinspection SpellCheckingInspection
-            with self.tag('thead'):
-                with self.tag('tr', bgcolor='#d8e1ed'):
-                    def get_weight(header):
-                        return 1 if isinstance(header, str) else header[1]
-
-                    total_weight = sum(get_weight(header) for header in headers)
-                    widths = [int(get_weight(header) / total_weight * 100) for header in headers]
-                    shortfall = 100 - sum(widths)
-                    for i in range(shortfall):
-                        widths[i] += 1
-
-                    for header, width in zip(headers, widths):
-                        with self.tag('th', width=f'{width}%'):
-                            if isinstance(header, str):
-                                self.text(header)
-                            else:
-                                self.text(header[0])
-            # noinspection SpellCheckingInspection
-            with self.tag('tbody'):
-                for i, row in enumerate(data):
-                    wrapped_row = [self._wrap(cell, width) for cell, width in zip(row, widths)]
-                    # use matrix transpose to go from list of (lists of lines per cell) => list (list of sub-rows)
-                    wrapped_sub_rows = itertools.zip_longest(*wrapped_row, fillvalue=' ')
-                    color = '#FFFFFF' if i % 2 == 0 else '#e9eef5'
-                    for sub_row in wrapped_sub_rows:
-                        with self.tag('tr', bgcolor=color):
-                            for cell in sub_row:
-                                with self.tag('td'):
-                                    self.text(cell)
+    def put_table(self, headers: Sequence[str | tuple[str, float]], data: Iterable[Sequence[str]]):
+        """
+        Draw a table straight to the PDF, laid out as `write_html` would lay out the equivalent bordered HTML table, but
+        without writing and parsing HTML for each cell. Rows are wrapped to fit their columns, and the header is
+        repeated on each page.
+        :param headers: the text of each column's header, optionally with its weight, the share of the table's width
+        it takes relative to the other columns, which is otherwise 1
+        :param data: the rows of the table, which are only iterated once
+        """
+        self.write_buffer()
+        pdf = self.pdf
+
+        def get_weight(header):
+            return 1 if isinstance(header, str) else header[1]
+
+        total_weight = sum(get_weight(header) for header in headers)
+        widths = [int(get_weight(header) / total_weight * 100) for header in headers]
+        shortfall = 100 - sum(widths)
+        for i in range(shortfall):
+            widths[i] += 1
+
+        header_texts = [header if isinstance(header, str) else header[0] for header in headers]
+        column_widths = [width * pdf.epw / 100 for width in widths]
+        table_x = (pdf.w - pdf.epw) / 2
+        column_xs = [table_x + sum(column_widths[:i]) for i in range(len(column_widths))]
+        row_height = pdf.font_size_pt / 72 * 25.4 * table_row_spacing
+
+        def put_header():
+            pdf.set_x(table_x)
+            pdf.set_font(style='B')
+            pdf.set_fill_color(*table_header_color)
+            for text, width in zip(header_texts, column_widths):
+                pdf.cell(width, row_height, text, border=1, align='C', fill=True)
+            pdf.set_font(style='')
+            pdf.ln(row_height)
+
+        def put_bottom_border():
+            pdf.line(pdf.x, pdf.y, pdf.x + sum(column_widths), pdf.y)
+
+        pdf.ln()
+        # a row's height is left blank above the table, as `write_html` does, so that reports look as they did
+        pdf.ln(row_height)
+        header_shown = False
+        for i, row in enumerate(data):
+            wrapped_row = [self._wrap(cell, width) for cell, width in zip(row, widths)]
+            # use matrix transpose to go from list of (lists of lines per cell) => list (list of sub-rows)
+            wrapped_sub_rows = itertools.zip_longest(*wrapped_row, fillvalue=' ')
+            color = table_row_colors[i % 2]
+            for sub_row in wrapped_sub_rows:
+                if pdf.y + row_height > pdf.page_break_trigger:
+                    put_bottom_border()
+                    pdf.add_page(same=True)
+                    header_shown = False
+                if not header_shown:
+                    put_header()
+                    header_shown = True
+
+                pdf.set_fill_color(*color)
+                for cell, x, width in zip(sub_row, column_xs, column_widths):
+                    pdf.set_x(x)
+                    pdf.cell(width, row_height, cell, border='LR', fill=True)
+                pdf.ln(row_height)
+
+        put_bottom_border()
+        pdf.ln(pdf.font_size_pt / 72 * 25.4)
+
+    def write_buffer(self):
+        if self.new_page:
+            self.pdf.add_page()
+            self.pdf.set_font('helvetica', size=12)
+            self.new_page = False
+        if self.html_buffer:
+            self.pdf.write_html(''.join(self.html_buffer))
+            self.html_buffer = []
+
+    def put_section(self, render: Callable[['PDFGenerator'], None], *key: Any):
+        """
+        Put a section starting on a new page. Its laid out pages are cached, so that when a report is generated again,
+        a section showing the same data is not laid out again.
+        :param render: puts the section's content
+        :param key: everything that `render` shows, which is hashed to identify the section
+        """
+        if self.html_buffer:
+            self.write_buffer()
+
+        section_hash = hashlib.sha256(repr(key).encode()).digest()
+        section = section_cache.get(section_hash)
+        if section is None:
+            self.new_page = True
+            first_page = self.pdf.page + 1
+            first_outline = len(self.pdf._outline)
+            render(self)
+            self.write_buffer()
+            section_cache.put(section_hash, self.laid_out(first_page, first_outline))
+        else:
+            self.put_laid_out(section)
+
+    def laid_out(self, first_page: int = 1, first_outline: int = 0) -> LaidOutSection:
+        """
+        :return: copies of the pages from `first_page` to the current page, and the outline entries added since there
+        were `first_outline` of them
+        """
+        pdf = self.pdf
+        if self.html_buffer:
+            self.write_buffer()
+        return LaidOutSection(
+            [dict(pdf.pages[page], content=bytes(pdf.pages[page]['content'])) for page in range(first_page, pdf.page + 1)],
+            [self._move_outline_section(outline_section, 1 - first_page)
+             for outline_section in pdf._outline[first_outline:]]
+        )
+
+    def put_laid_out(self, section: LaidOutSection, outline_title: Optional[str] = None):
+        """
+        Put the pages of a section laid out before, starting on a new page
+        :param outline_title: if given, an entry in the document outline for the section's first page, which the
+        section's own entries are put under
+        """
+        if self.html_buffer:
+            self.write_buffer()
+
+        pdf = self.pdf
+        first_page = pdf.page + 1
+        outline_levels = 0
+        if outline_title is not None:
+            pdf._outline.append(OutlineSection(outline_title, 0, first_page, DestinationXYZ(first_page)))
+            outline_levels = 1
+
+        for page in section.pages:
+            pdf.page += 1
+            pdf.pages[pdf.page] = dict(page, content=bytearray(page['content']))
+        pdf._outline.extend(
+            self._move_outline_section(outline_section, first_page - 1, outline_levels)
+            for outline_section in section.outline
+        )
+
+        # the position on the last page is not known, so anything after starts a new page
+        self.new_page = True
+
+    @staticmethod
+    def _move_outline_section(outline_section: OutlineSection, pages: int, levels: int = 0) -> OutlineSection:
+        dest = outline_section.dest
+        return outline_section._replace(
+            level=outline_section.level + levels,
+            page_number=outline_section.page_number + pages,
+            dest=DestinationXYZ(dest.page + pages, dest.x, dest.y, dest.zoom, dest.page_as_obj_id)
+        )
 
     def output(self, path):
-        self.pdf.write_html(''.join(self.html_buffer))
+        if self.html_buffer or self.pdf.page == 0:
+            self.write_buffer()
         self.pdf.output(path)
+        if isinstance(self.pdf.pages, PageSpool):
+            self.pdf.pages.close()
+
+    def string_width(self, text: str) -> float:
+        """
+        Measure `text` in the current font. The widths are memoized, since the same words and characters recur in
+        every row of a table.
+        """
+        pdf = self.pdf
+        key = (pdf.font_family, pdf.font_style, pdf.font_size_pt, text)
+        width = self.string_widths.get(key)
+        if width is None:
+            width = self.string_widths[key] = pdf.get_string_width(text)
+        return width
 
     def _wrap(self, cell: str, width_percent: int):
         input_lines = cell.split('\n')
@@ -93,29 +344,32 @@ class PDFGenerator:
         words = re.findall(r'(\s*\S+)(\s*)', cell)
         lines = []
         line = ''
+        # string widths add up, so the width of the line is kept as it grows rather than measured again
+        line_width = 0
         previous_whitespace = ''
         i = 0
         while i < len(words):  # using while loop so `i` can be modified during iteration
             word, trailing_whitespace = words[i]
+            word_width = self.string_width(word)
 
-            if self.pdf.get_string_width(word) > cell_width_px:
-                sub_word = ''
-                j = 0
-                for j, letter in enumerate(word):
-                    sub_word += letter
-                    if self.pdf.get_string_width(line + sub_word) > cell_width_px:
-                        break
-                lines.append(line + previous_whitespace + sub_word[:-1])
+            if word_width > cell_width_px:
+                # split the word at the first letter which overflows the line, found from the widths of its prefixes
+                prefix_widths = list(itertools.accumulate(map(self.string_width, word)))
+                j = min(bisect.bisect_right(prefix_widths, cell_width_px - line_width), len(word) - 1)
+                lines.append(line + previous_whitespace + word[:j])
                 line = ''
+                line_width = 0
                 previous_whitespace = ''
 
                 words[i] = word[j:], trailing_whitespace
             else:
-                if self.pdf.get_string_width(line + word) > cell_width_px:
+                if line_width + word_width > cell_width_px:
                     lines.append(line)
                     line = ''
+                    line_width = 0
                     previous_whitespace = ''
                 line += previous_whitespace + word
+                line_width += self.string_width(previous_whitespace) + word_width
                 previous_whitespace = trailing_whitespace
 
                 i += 1
@@ -139,10 +393,64 @@ class AutoClosingTag:
         self.report_generator.put(f'</{self.tag_name}>')
 
 
+def report_name(document_path: Optional[str | Path]) -> str:
+    """
+    :return: the default file name of a report generated today, without the `.pdf` suffix
+    """
+    name = 'Report' if document_path is None else Path(document_path).stem
+    return f'{name} {date.today().strftime("%d%b%Y")}'
+
+
 def generate_report(data: RentManagerState, calculations: RentCalculations, export_path: str | Path):
+    """
+    Generate a report with the summary, payments to landlord and rent per month, followed by all the transactions,
+    with each year's transactions starting on a new page. Unchanged sections of a report generated before are reused
+    (see `PDFGenerator.put_section`). Pages are streamed to a temporary file as they are completed, so that a long
+    ledger's report does not have to fit in memory.
+    """
+    pdf = PDFGenerator(streaming=True)
+    put_report(pdf, data, calculations)
+    pdf.output(str(export_path))
+
+
+def lay_out_report(data: RentManagerState, calculations: RentCalculations) -> LaidOutSection:
+    """
+    Lay out a report, as `generate_report` does, to be put in a portfolio report
+    """
     pdf = PDFGenerator()
-    with pdf.tag('h1'):
-        pdf.put('Summary')
+    put_report(pdf, data, calculations)
+    return pdf.laid_out()
+
+
+def generate_portfolio_report(reports: Sequence[tuple[str, LaidOutSection]], export_path: str | Path):
+    """
+    Generate a report of several properties, starting with a table of contents, and followed by each property's
+    report (see `lay_out_report`) under its name in the document outline.
+    :param reports: the name of each property, with its laid out report
+    """
+    def contents(pdf_: PDFGenerator, first_page: int):
+        rows = []
+        for name, report in reports:
+            rows.append([name, str(first_page)])
+            first_page += len(report.pages)
+
+        with pdf_.tag('h1'):
+            pdf_.put('Contents')
+        pdf_.put_table([('Property', 5), 'Page'], rows)
+
+    # the properties' page numbers depend on how many pages the contents take
+    draft = PDFGenerator()
+    contents(draft, 1)
+    draft.write_buffer()
+
+    pdf = PDFGenerator(streaming=True)
+    contents(pdf, draft.pdf.page + 1)
+    for name, report in reports:
+        pdf.put_laid_out(report, outline_title=name)
+    pdf.output(str(export_path))
+
+
+def put_report(pdf: PDFGenerator, data: RentManagerState, calculations: RentCalculations):
 
     costs_and_fees = format_currency(
         calculations.other_transaction_sums[TransactionReason.Cost]
@@ -156,32 +464,23 @@ def generate_report(data: RentManagerState, calculations: RentCalculations, expo
                          f'{format_currency(calculations.float_)}')
     else:
         float_message = format_currency(calculations.float_)
-    pdf.put_table(
-        [' ', 'Amount'],
-        [
-            ['Total rent received', format_currency(calculations.total_rent_received)],
-            ['Costs', costs_and_fees],
-            ['Payments to landlord', total_payments],
-            ['Balance', format_currency(calculations.balance)],
-            [f'Float (base float = {format_currency(arrangements.base_float)})',
-             float_message]
-        ]
-    )
+    summary = [
+        ['Total rent received', format_currency(calculations.total_rent_received)],
+        ['Costs', costs_and_fees],
+        ['Payments to landlord', total_payments],
+        ['Balance', format_currency(calculations.balance)],
+        [f'Float (base float = {format_currency(arrangements.base_float)})',
+         float_message]
+    ]
 
     date_format = '%d/%m/%Y'
     month_format = '%b %Y'
-    with pdf.tag('h1'):
-        pdf.put('Payments to landlord')
     transaction: OtherTransaction
-    pdf.put_table(
-        ['Date', 'Amount'],
-        [[transaction.date_.strftime(date_format), format_currency(transaction.amount)]
-         for transaction in data.rent_manager_main_state.other_transactions
-         if transaction.reason is TransactionReason.ToLandlord]
-    )
-
-    with pdf.tag('h1'):
-        pdf.put('Rent received per month')
+    landlord_payments = [
+        [transaction.date_.strftime(date_format), format_currency(transaction.amount)]
+        for transaction in data.rent_manager_main_state.other_transactions
+        if transaction.reason is TransactionReason.ToLandlord
+    ]
 
     rent_for_months = []
     for month, paid in calculations.rent_for_months:
@@ -191,29 +490,62 @@ def generate_report(data: RentManagerState, calculations: RentCalculations, expo
             month.strftime(month_format), format_currency(paid),
             format_currency(month_arrears)
         ])
-    pdf.put_table(
-        ['Month', 'Amount Paid', 'Arrears for month'],
-        rent_for_months
-    )
 
-    all_transactions = calculations.balance_annotated_transactions
+    def overview(pdf_: PDFGenerator):
+        with pdf_.tag('h1'):
+            pdf_.put('Summary')
+        pdf_.put_table([' ', 'Amount'], summary)
+
+        with pdf_.tag('h1'):
+            pdf_.put('Payments to landlord')
+        pdf_.put_table(['Date', 'Amount'], landlord_payments)
 
-    with pdf.tag('h1'):
-        pdf.put('All transactions')
+        with pdf_.tag('h1'):
+            pdf_.put('Rent received per month')
+        pdf_.put_table(['Month', 'Amount Paid', 'Arrears for month'], rent_for_months)
 
+    pdf.put_section(overview, 'overview', summary, landlord_payments, rent_for_months)
+
+    transaction_headers = ['Date', 'Type', 'Amount', ('Comment', 2), 'Balance', 'Float']
     any_transaction: AnyTransaction
     annotated_transaction: BalanceAnnotatedTransaction
-    pdf.put_table(['Date', 'Type', 'Amount', ('Comment', 2), 'Balance', 'Float'], [
-        [
-            any_transaction.date.strftime(date_format),
-            any_transaction.type,
-            format_currency(any_transaction.amount),
-            any_transaction.comment,
-            format_currency(annotated_transaction.current_balance),
-            format_currency(annotated_transaction.current_float)
-        ]
-        for annotated_transaction in all_transactions
-        for any_transaction in (annotated_transaction.inner,)
-    ])
-
-    pdf.output(str(export_path))
+    years = [
+        (year, [
+            [
+                any_transaction.date.strftime(date_format),
+                any_transaction.type,
+                format_currency(any_transaction.amount),
+                any_transaction.comment,
+                format_currency(annotated_transaction.current_balance),
+                format_currency(annotated_transaction.current_float)
+            ]
+            for annotated_transaction in annotated_transactions
+            for any_transaction in (annotated_transaction.inner,)
+        ])
+        for year, annotated_transactions in itertools.groupby(
+            calculations.balance_annotated_transactions,
+            lambda annotated: annotated.inner.date.year
+        )
+    ]
+
+    def transactions_heading(pdf_: PDFGenerator):
+        with pdf_.tag('h1'):
+            pdf_.put('All transactions')
+
+    # the heading is put at the top of the first year's page, since each section starts a new page
+    if not years:
+        def no_transactions(pdf_: PDFGenerator):
+            transactions_heading(pdf_)
+            pdf_.put_table(transaction_headers, [])
+
+        pdf.put_section(no_transactions, 'transactions')
+
+    for i, (year, rows) in enumerate(years):
+        def transactions_in_year(pdf_: PDFGenerator, first=i == 0, year=year, rows=rows):
+            if first:
+                transactions_heading(pdf_)
+            with pdf_.tag('h2'):
+                pdf_.text(str(year))
+            pdf_.put_table(transaction_headers, rows)
+
+        pdf.put_section(transactions_in_year, 'transactions', i == 0, year, rows)
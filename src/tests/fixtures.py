@@ -0,0 +1,35 @@
+import random
+from datetime import date, timedelta
+
+from rent_manager.state.other_transaction import OtherTransaction, TransactionReason
+from rent_manager.state.rent_arrangement_data import RentArrangementData
+from rent_manager.state.rent_manager_state import RentManagerState, RentManagerMainState
+from rent_manager.state.rent_payment import RentPayment
+
+
+def make_ledger(months: int, transactions_per_month: int = 3, seed: int = 0) -> RentManagerState:
+    """
+    Generate a plausible ledger: a rent payment every month, plus some other transactions in each month
+    """
+    rng = random.Random(seed)
+    start_date = date(2000, 1, 1)
+    monthly_rent = 95000
+    reasons = list(TransactionReason)
+
+    rent_payments = []
+    other_transactions = []
+    for month in range(months):
+        for_month = date(start_date.year + month // 12, month % 12 + 1, 1)
+        rent_payments.append(RentPayment(monthly_rent, for_month + timedelta(days=rng.randrange(28)), for_month))
+        for _ in range(transactions_per_month):
+            other_transactions.append(OtherTransaction(
+                rng.choice(reasons),
+                rng.randrange(1, 50000),
+                ' '.join(rng.choice(('Boiler', 'repair', 'for', 'flat', 'garden', 'invoice')) for _ in range(6)),
+                for_month + timedelta(days=rng.randrange(28))
+            ))
+
+    return RentManagerState(
+        RentManagerMainState(rent_payments, other_transactions),
+        RentArrangementData(start_date, monthly_rent, 10, 50000, 50000, 0)
+    )
@@ -0,0 +1,36 @@
+import unittest
+from datetime import date
+
+from rent_manager.state.all_transactions import get_all_transactions
+from rent_manager.state.other_transaction import OtherTransaction, TransactionReason
+from rent_manager.state.rent_manager_state import RentManagerState, RentManagerMainState
+from rent_manager.state.rent_payment import RentPayment
+
+
+class AllTransactionsTest(unittest.TestCase):
+    def setUp(self):
+        self.state = RentManagerState(RentManagerMainState(
+            [RentPayment(100, date(2021, 1, 1), date(2021, 1, 1)),
+             RentPayment(100, date(2021, 3, 1), date(2021, 3, 1))],
+            [OtherTransaction(TransactionReason.Cost, 10, 'first', date(2021, 2, 1)),
+             OtherTransaction(TransactionReason.Cost, 20, 'second', date(2021, 4, 1))]
+        ))
+
+    def dates(self):
+        return [transaction.date for transaction in get_all_transactions(self.state)]
+
+    def test_in_place_edits(self):
+        main_state = self.state.rent_manager_main_state
+        self.assertEqual([date(2021, 1, 1), date(2021, 2, 1), date(2021, 3, 1), date(2021, 4, 1)], self.dates())
+
+        main_state.rent_payments.append(RentPayment(100, date(2020, 12, 1), date(2020, 12, 1)))
+        self.assertEqual([date(2020, 12, 1), date(2021, 1, 1), date(2021, 2, 1), date(2021, 3, 1), date(2021, 4, 1)],
+                         self.dates())
+
+        main_state.other_transactions[1].date_ = date(2020, 11, 1)
+        self.assertEqual(['second', 'For month Dec 2020', 'For month Jan 2021', 'first', 'For month Mar 2021'],
+                         [transaction.comment for transaction in get_all_transactions(self.state)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,17 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+class BatchImportTest(unittest.TestCase):
+    def test_no_tkinter(self):
+        # run in a fresh interpreter, as other tests may already have imported tkinter
+        subprocess.run(
+            [sys.executable, '-c', "import batch, sys; assert 'tkinter' not in sys.modules"],
+            cwd=Path(__file__).parent.parent, check=True
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import dataclasses
+import random
+import unittest
+from datetime import date, timedelta
+
+from rent_manager.state import columnar
+from rent_manager.state.other_transaction import OtherTransaction, TransactionReason
+from rent_manager.state.rent_calculations import RentCalculations, CalculationBackend, python_rent_for_months, \
+    python_other_transaction_sums
+from rent_manager.state.rent_payment import RentPayment
+from tests.fixtures import make_ledger
+
+
+@unittest.skipUnless(columnar.available, 'NumPy is not installed')
+class CalculationBackendsTest(unittest.TestCase):
+    def assert_rent_for_months_match(self, start_date, months_since_start, rent_payments):
+        with self.assertLogs(level='WARNING') if self.outside_period(start_date, months_since_start, rent_payments) \
+                else self.assertNoLogs(level='WARNING'):
+            numpy_result = columnar.rent_for_months(start_date, months_since_start, rent_payments)
+        self.assertEqual(python_rent_for_months(start_date, months_since_start, rent_payments), numpy_result)
+
+    @staticmethod
+    def outside_period(start_date, months_since_start, rent_payments):
+        months = set(month for month, _ in python_rent_for_months(start_date, months_since_start, []))
+        return any(rent_payment.for_month not in months for rent_payment in rent_payments)
+
+    def test_rent_for_months(self):
+        rng = random.Random(0)
+        start_date = date(2010, 3, 1)
+        rent_payments = [
+            RentPayment(
+                rng.randrange(1, 100000),
+                start_date,
+                date(2010 + month // 12, month % 12 + 1, 1)
+            )
+            for month in (rng.randrange(2, 40) for _ in range(200))
+        ]
+        self.assert_rent_for_months_match(start_date, 36, rent_payments)
+
+    def test_rent_for_months_outside_period(self):
+        start_date = date(2010, 3, 1)
+        rent_payments = [
+            RentPayment(100, start_date, date(2010, 2, 1)),
+            RentPayment(200, start_date, date(2010, 3, 1)),
+            RentPayment(300, start_date, date(2010, 4, 2)),
+            RentPayment(400, start_date, date(2013, 3, 1)),
+        ]
+        self.assert_rent_for_months_match(start_date, 36, rent_payments)
+
+    def test_rent_for_months_before_start(self):
+        start_date = date.today() + timedelta(days=100)
+        for rent_payments in ([], [RentPayment(100, start_date, start_date.replace(day=1))]):
+            self.assert_rent_for_months_match(start_date, -3, rent_payments)
+
+    def test_other_transaction_sums(self):
+        rng = random.Random(0)
+        for count in (0, 1, 500):
+            other_transactions = [
+                OtherTransaction(rng.choice(list(TransactionReason)), rng.randrange(1, 50000), '',
+                                 date(2010, 1, 1) + timedelta(days=rng.randrange(1000)))
+                for _ in range(count)
+            ]
+            self.assertEqual(
+                python_other_transaction_sums(other_transactions),
+                columnar.other_transaction_sums(other_transactions)
+            )
+
+    def test_calculations(self):
+        data = make_ledger(12 * 5)
+        for start_date in (data.rent_arrangement_data.start_date, date.today() + timedelta(days=100)):
+            state = dataclasses.replace(
+                data,
+                rent_arrangement_data=dataclasses.replace(data.rent_arrangement_data, start_date=start_date)
+            )
+            with self.assertLogs(level='WARNING') if start_date > date.today() else self.assertNoLogs(level='WARNING'):
+                python_calculations = RentCalculations.from_rent_manager_state(
+                    state, backend=CalculationBackend.Python
+                )
+                numpy_calculations = RentCalculations.from_rent_manager_state(state, backend=CalculationBackend.NumPy)
+            # the backends differ only in the sums, while the balance annotated transactions are compared by identity
+            self.assertEqual(
+                dataclasses.replace(python_calculations, balance_annotated_transactions=[]),
+                dataclasses.replace(numpy_calculations, balance_annotated_transactions=[])
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
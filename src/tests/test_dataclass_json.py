@@ -0,0 +1,36 @@
+import io
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import dataclass_json
+from rent_manager.state.rent_manager_state import RentManagerState
+from tests.test_dataclass_binary import sample_state
+
+
+class DataclassJsonTest(unittest.TestCase):
+    def test_compile_in_threads(self):
+        text = dataclass_json.dumps(sample_state())
+        switch_interval = sys.getswitchinterval()
+        # switch threads often, so that they are likely to reach a type while another is compiling it
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(50):
+                dataclass_json.Serializer.loaders.clear()
+                start = threading.Barrier(4)
+
+                def load():
+                    start.wait()
+                    return dataclass_json.load(RentManagerState, io.StringIO(text))
+
+                with ThreadPoolExecutor(4) as executor:
+                    futures = [executor.submit(load) for _ in range(4)]
+                    for future in futures:
+                        self.assertEqual(sample_state(), future.result())
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from rent_manager import collate_and_export
+from rent_manager.collate_and_export import FileValidator
+
+
+class FakeWidget:
+    """
+    Runs the callbacks scheduled with `after` when asked to, in place of the Tk event loop
+    """
+
+    def __init__(self):
+        self.scheduled = {}
+        self.next_id = 0
+
+    def after(self, _ms, callback):
+        self.next_id += 1
+        self.scheduled[str(self.next_id)] = callback
+        return str(self.next_id)
+
+    def after_cancel(self, after_id):
+        del self.scheduled[after_id]
+
+    def run_until_idle(self):
+        while self.scheduled:
+            collate_and_export.file_validation_executor.submit(lambda: None).result()
+            after_id = next(iter(self.scheduled))
+            self.scheduled.pop(after_id)()
+
+
+class FileValidatorTest(unittest.TestCase):
+    def test_unexpected_error(self):
+        def get(path):
+            raise ValueError(f'bad {path}')
+
+        widget = FakeWidget()
+        validator = FileValidator(widget)
+        delivered = []
+        with mock.patch.object(collate_and_export.summary_cache, 'get', side_effect=get):
+            validator.validate(['a.rman', 'b.rman'], delivered.extend)
+            widget.run_until_idle()
+
+        self.assertEqual(['a.rman', 'b.rman'], [result.path for result in delivered])
+        self.assertFalse(any(result.valid for result in delivered))
+        self.assertIn('bad a.rman', delivered[0].message)
+        self.assertEqual({}, validator.in_flight)
+
+    def test_deliver_error_keeps_polling(self):
+        widget = FakeWidget()
+        validator = FileValidator(widget)
+        delivered = []
+
+        def fail(_batch):
+            raise RuntimeError('deliver failed')
+
+        with mock.patch.object(collate_and_export.summary_cache, 'get', side_effect=FileNotFoundError):
+            validator.validate(['a.rman'], fail)
+            validator.validate(['b.rman'], delivered.extend)
+            with self.assertRaises(RuntimeError):
+                widget.run_until_idle()
+            widget.run_until_idle()
+
+        self.assertEqual(['b.rman'], [result.path for result in delivered])
+
+
+if __name__ == '__main__':
+    unittest.main()
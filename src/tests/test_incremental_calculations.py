@@ -0,0 +1,98 @@
+import dataclasses
+import random
+import unittest
+from datetime import date, timedelta
+from operator import attrgetter
+
+from rent_manager.state.other_transaction import OtherTransaction, TransactionReason
+from rent_manager.state.rent_calculations import RentCalculations, IncrementalRentCalculations, ChangedPositions
+from rent_manager.state.rent_manager_state import RentManagerMainState
+from rent_manager.state.rent_payment import RentPayment
+from tests.fixtures import make_ledger
+
+
+def comparable(calculations: RentCalculations):
+    # the balance annotated transactions wrap the transactions in new objects on every calculation
+    return dataclasses.replace(calculations, balance_annotated_transactions=[
+        (annotated.inner.unwrap(), annotated.current_balance, annotated.current_float)
+        for annotated in calculations.balance_annotated_transactions
+    ])
+
+
+class IncrementalCalculationsTest(unittest.TestCase):
+    def random_transaction(self, rng: random.Random, rent: bool):
+        received_on = date(2000, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+        if rent:
+            return RentPayment(rng.randrange(1, 100000), received_on, received_on.replace(day=1))
+        return OtherTransaction(rng.choice(list(TransactionReason)), rng.randrange(1, 50000), '', received_on)
+
+    def edit(self, rng: random.Random, items: list, rent: bool) -> int:
+        """
+        Make a random edit to `items` in place, as the list view would
+        :return: the position of the first changed item
+        """
+        match rng.choice(('add', 'insert', 'delete', 'change', 'swap')):
+            case 'add':
+                items.append(self.random_transaction(rng, rent))
+                return len(items) - 1
+            case 'insert':
+                position = rng.randrange(len(items) + 1)
+                items.insert(position, self.random_transaction(rng, rent))
+            case 'delete' if items:
+                position = rng.randrange(len(items))
+                del items[position]
+            case 'change' if items:
+                # most edits are to recent transactions
+                position = max(len(items) - 1 - int(rng.expovariate(0.1)), 0)
+                items[position] = self.random_transaction(rng, rent)
+            case 'swap' if len(items) > 1:
+                position = rng.randrange(len(items) - 1)
+                items[position], items[position + 1] = items[position + 1], items[position]
+            case _:
+                position = len(items)
+        return position
+
+    def check_edits(self, data):
+        rng = random.Random(0)
+        calculations = IncrementalRentCalculations()
+        calculations.calculate(data)
+        for _ in range(200):
+            rent_payments = list(data.rent_manager_main_state.rent_payments)
+            other_transactions = list(data.rent_manager_main_state.other_transactions)
+            changed = {'rent_payments': None, 'other_transactions': None}
+            for _ in range(rng.randrange(4)):
+                field, items, rent = rng.choice((('rent_payments', rent_payments, True),
+                                                 ('other_transactions', other_transactions, False)))
+                position = self.edit(rng, items, rent)
+                changed[field] = position if changed[field] is None else min(changed[field], position)
+
+            data = dataclasses.replace(data, rent_manager_main_state=RentManagerMainState(rent_payments,
+                                                                                          other_transactions))
+            self.assertEqual(
+                comparable(RentCalculations.from_rent_manager_state(data)),
+                comparable(calculations.calculate(data, ChangedPositions(**changed)))
+            )
+
+    def test_edits(self):
+        self.check_edits(make_ledger(12 * 5))
+
+    def test_edits_in_date_order(self):
+        data = make_ledger(12 * 5)
+        data.rent_manager_main_state.other_transactions.sort(key=attrgetter('date_'))
+        self.check_edits(data)
+
+    def test_arrangement_change(self):
+        data = make_ledger(12 * 5)
+        calculations = IncrementalRentCalculations()
+        calculations.calculate(data)
+        data = dataclasses.replace(
+            data, rent_arrangement_data=dataclasses.replace(data.rent_arrangement_data, base_float=0)
+        )
+        self.assertEqual(
+            comparable(RentCalculations.from_rent_manager_state(data)),
+            comparable(calculations.calculate(data, ChangedPositions(None, None)))
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
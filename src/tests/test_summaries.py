@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from rent_manager import document, summaries
+from tests.test_dataclass_binary import sample_state
+
+
+class SummaryCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'sample.rman'
+        document.save(sample_state(), self.path)
+        self.cache = summaries.SummaryCache(Path(directory.name) / 'summaries.json')
+        self.addCleanup(self.cache.flush)
+
+    def touch(self):
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def assert_not_parsed(self):
+        return mock.patch.object(document, 'load', side_effect=AssertionError('the document was parsed'))
+
+    def test_unchanged_content_after_parse(self):
+        summary = self.cache.get(self.path)
+        self.touch()
+        with self.assert_not_parsed():
+            self.assertEqual(summary, self.cache.get(self.path))
+
+    def test_unchanged_content_after_save(self):
+        self.cache.record(self.path, sample_state())
+        self.touch()
+        with self.assert_not_parsed():
+            self.assertEqual(summaries.summarise(sample_state()), self.cache.get(self.path))
+
+    def test_changed_content_of_same_size(self):
+        self.cache.get(self.path)
+        state = sample_state()
+        state.rent_manager_main_state.rent_payments[-1].received_on = date(2021, 2, 9)
+        document.save(state, self.path)
+        self.touch()
+        self.assertEqual(summaries.summarise(state), self.cache.get(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import tkinter as tk
+from typing import Callable
 
 
 class VerticalScrolledFrame(tk.Frame):
@@ -9,11 +10,20 @@ class VerticalScrolledFrame(tk.Frame):
     def __init__(self, parent, *args, **kw):
         super().__init__(parent, *args, **kw)
 
+        # called whenever the visible part of the interior changes
+        self.scroll_listeners: set[Callable[[], None]] = set()
+
         # create a canvas object and a vertical scrollbar for scrolling it
         v_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL)
         v_scrollbar.pack(fill=tk.Y, side=tk.RIGHT, expand=tk.FALSE)
+
+        def _on_scroll(first, last):
+            v_scrollbar.set(first, last)
+            for scroll_listener in self.scroll_listeners:
+                scroll_listener()
+
         canvas = tk.Canvas(self, bd=0, highlightthickness=0,
-                           yscrollcommand=v_scrollbar.set)
+                           yscrollcommand=_on_scroll)
         self.canvas = canvas
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=tk.TRUE)
         v_scrollbar.config(command=canvas.yview)
@@ -1,10 +1,13 @@
+import contextlib
 import dataclasses
 import inspect
 import tkinter as tk
 import typing
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import TypeVar, Generic, Callable, Optional, Type, Any
+from typing import TypeVar, Generic, Callable, Optional, Type, Any, ContextManager
+
+from traits.record import ViewableRecord
 
 
 class View(ABC):
@@ -44,9 +47,89 @@ class Action(Generic[U], ABC):
 Act = TypeVar('Act', bound=Action)
 
 
+@dataclass
+class ChangeBatch(Generic[Act]):
+    """
+    The actions applied to a view since its change bus last notified its listeners
+    """
+    actions: list[Act]
+
+    @property
+    def dirty_fields(self) -> Optional[frozenset[str]]:
+        """
+        :return: the fields of a record changed by the actions, or None if any action is not that of a record's field
+        """
+        dirty_fields = set()
+        actions = list(self.actions)
+        while actions:
+            action = actions.pop()
+            if isinstance(action, RecordAction):
+                dirty_fields.add(action.field)
+            elif isinstance(action, ActionGroup):
+                actions.extend(action.actions)
+            else:
+                return None
+        return frozenset(dirty_fields)
+
+
+class ChangeBus(Generic[Act]):
+    """
+    Notifies its listeners of the actions applied to a view once per Tk idle cycle, so that a burst of actions, such as
+    typing, is handled once. Listeners with a higher priority are notified first.
+    """
+
+    def __init__(self):
+        self.listeners: dict[Callable[[ChangeBatch[Act]], None], int] = {}
+        self.pending: list[Act] = []
+        self.root: Optional[tk.Misc] = None
+        self.idle_id: Optional[str] = None
+
+    def subscribe(self, listener: Callable[[ChangeBatch[Act]], None], priority: int = 0):
+        self.listeners[listener] = priority
+
+    def unsubscribe(self, listener: Callable[[ChangeBatch[Act]], None]):
+        self.listeners.pop(listener, None)
+
+    def publish(self, action: Act, widget: tk.Misc):
+        """
+        :param widget: a widget of the view, on whose root the notification is scheduled
+        """
+        if not self.listeners:
+            return
+
+        self.pending.append(action)
+        if self.idle_id is None:
+            # scheduled on the root, as the view's own widget may be destroyed before it is idle
+            self.root = widget.nametowidget('.')
+            self.idle_id = self.root.after_idle(self.on_idle)
+
+    def on_idle(self):
+        self.idle_id = None
+        self.flush()
+
+    def flush(self):
+        """
+        Notify the listeners of the pending actions now, such as before reading state which they keep up to date
+        """
+        if self.idle_id is not None:
+            self.root.after_cancel(self.idle_id)
+            self.idle_id = None
+
+        if not self.pending:
+            return
+
+        batch = ChangeBatch(self.pending)
+        self.pending = []
+        for listener in sorted(self.listeners, key=self.listeners.__getitem__, reverse=True):
+            listener(batch)
+
+
 @dataclass
 class EditableView(Generic[T, Act], View):
+    # notified of each action as it is applied
     change_listeners: set[Callable[[Act], None]] = field(default_factory=set, init=False)
+    # notified of the actions applied in each Tk idle cycle, for listeners which are slow to update
+    change_bus: ChangeBus[Act] = field(default_factory=ChangeBus, init=False)
 
     def __call__(self, parent) -> tk.Widget:
         return self.widget
@@ -61,10 +144,21 @@ class EditableView(Generic[T, Act], View):
         pass
 
     def action(self, action: Act):
+        self.notify_change(action)
+
+        action.do(self)
+        self.invalidate_state()
+
+    def invalidate_state(self):
+        """
+        Forget any state kept by `get_state`, as an action has changed the view
+        """
+
+    def notify_change(self, action: Act):
         for change_listener in self.change_listeners:
             change_listener(action)
 
-        action.do(self)
+        self.change_bus.publish(action, self.widget)
 
 
 class ViewWrapper(Generic[T]):
@@ -107,31 +201,26 @@ class ViewWrapper(Generic[T]):
         if self.wrapped_view is not None:
             return self.wrapped_view.change_listeners
 
+    @property
+    def change_bus(self) -> Optional[ChangeBus]:
+        if self.wrapped_view is not None:
+            return self.wrapped_view.change_bus
+
     @classmethod
     def is_editable(cls):
         return issubclass(cls.wrapping_class, EditableView)
 
 
-@dataclass
-class ViewableRecord(ABC):
-    @abstractmethod
-    def configure(self, *args, **kwargs):
-        pass
-
-    def view(self, *, editing=False) -> ViewWrapper:
-        return RecordView(self, editing)
-
-
 @dataclass
 class RecordAction(Action):
     inner_action: Action
     field: str
 
     def do(self, view: '_RecordView'):
-        self.inner_action.do(view.field_views[self.field].wrapped_view)
+        self.inner_action.do(view.field_changed(self.field))
 
     def undo(self, view: '_RecordView'):
-        self.inner_action.undo(view.field_views[self.field].wrapped_view)
+        self.inner_action.undo(view.field_changed(self.field))
 
     def stack(self, other: 'Action') -> 'Optional[Action]':
         other = typing.cast(RecordAction, other)
@@ -139,6 +228,22 @@ class RecordAction(Action):
             return self.checked_stack(self, other, 'inner_action', lambda a: RecordAction(a, self.field))
 
 
+@dataclass
+class ActionGroup(Action):
+    """
+    Actions which were done together, and are undone together
+    """
+    actions: list[Action]
+
+    def do(self, view):
+        for action in self.actions:
+            action.do(view)
+
+    def undo(self, view):
+        for action in reversed(self.actions):
+            action.undo(view)
+
+
 class _RecordView(EditableView[T, RecordAction]):
     config_kwargs = {}
 
@@ -173,7 +278,14 @@ class _RecordView(EditableView[T, RecordAction]):
     def __init__(self, parent, data):
         super().__init__()
 
+        # the actions of the fields while in `group_changes`
+        self.grouped_actions: Optional[list[RecordAction]] = None
+
         self.field_views = self.make_field_views(data)
+
+        # the state last made by `get_state`. All the fields are read again once any changes, as the state of one may
+        # depend on the others, such as a day which is validated against its month.
+        self.state: Optional[T] = None
         for view in self.field_views.values():
             if view.is_editable():
                 view.editing = True
@@ -183,28 +295,69 @@ class _RecordView(EditableView[T, RecordAction]):
 
         for field, view in self.field_views.items():
             if view.is_editable() and view.change_listeners is not None:
-                view.change_listeners.add(lambda action, field=field: self.on_change(RecordAction(action, field)))
+                view.change_listeners.add(lambda action, field=field: self.on_field_change(field, action))
 
         self.data = data
 
     def get_state(self) -> T:
-        results = {
-            field: editable_view.get_state()
-            for field, view in self.field_views.items()
-            if hasattr(view, 'editing')
-            for editable_view in (typing.cast(EditableView, view),)
-            if editable_view.get_state
-        }
-        if all(result is not None for result in results.values()):
-            return dataclasses.replace(self.data, **results)
+        if self.state is None:
+            results = {
+                field: editable_view.get_state()
+                for field, view in self.field_views.items()
+                if hasattr(view, 'editing')
+                for editable_view in (typing.cast(EditableView, view),)
+                if editable_view.get_state
+            }
+            if any(result is None for result in results.values()):
+                return None
+            self.state = dataclasses.replace(self.data, **results)
+        return self.state
+
+    def field_changed(self, field: str) -> Optional[EditableView]:
+        """
+        :return: the editable view of the field, for an action to change
+        """
+        self.state = None
+
+        field_view = self.field_views[field].wrapped_view
+        if field_view is not None:
+            field_view.invalidate_state()
+        return field_view
 
     @property
     def widget(self):
         return self.frame
 
-    def on_change(self, action: RecordAction):
-        for change_listener in self.change_listeners:
-            change_listener(action)
+    def on_field_change(self, field: str, action: Action):
+        self.field_changed(field)
+        self.on_change(RecordAction(action, field))
+
+    def on_change(self, action: RecordAction | ActionGroup):
+        if self.grouped_actions is not None:
+            self.grouped_actions.append(action)
+            return
+
+        self.notify_change(action)
+
+    @contextlib.contextmanager
+    def group_changes(self):
+        """
+        Notify the changes made to the fields within the context once it ends, as one `ActionGroup`, so that they are
+        undone together
+        """
+        if self.grouped_actions is not None:
+            yield
+            return
+
+        self.grouped_actions = []
+        try:
+            yield
+        finally:
+            actions, self.grouped_actions = self.grouped_actions, None
+            if len(actions) == 1:
+                self.on_change(actions[0])
+            elif actions:
+                self.on_change(ActionGroup(actions))
 
 
 class RecordView(ViewWrapper):
@@ -213,6 +366,21 @@ class RecordView(ViewWrapper):
     def _call_with_kwargs(self, parent: tk.Misc, kwargs) -> tk.Widget:
         return super()._call_with_kwargs(parent, {'config_kwargs': kwargs})
 
+    def group_changes(self) -> ContextManager:
+        """
+        :return: a context in which the changes made to the fields are undone together, see
+        `_RecordView.group_changes`
+        """
+        if self.wrapped_view is None:
+            return contextlib.nullcontext()
+        return typing.cast(_RecordView, self.wrapped_view).group_changes()
+
+    def field_view(self, field: str) -> ViewWrapper:
+        """
+        :return: the view of a field, while the record is shown
+        """
+        return typing.cast(_RecordView, self.wrapped_view).field_views[field]
+
 
 RV = TypeVar('RV', bound=RecordView)
 TypeVR = TypeVar('TypeVR', bound=Type[ViewableRecord])
@@ -268,8 +436,7 @@ def iso_view(iso: Type[Isomorphism[T, ViewableRecord]]) -> Type[ViewWrapper]:
             self.inner_view.change_listeners.add(self.on_change)
 
         def on_change(self, action: Action):
-            for change_listener in self.change_listeners:
-                change_listener(IsoAction(action))
+            self.notify_change(IsoAction(action))
 
         @property
         def widget(self):
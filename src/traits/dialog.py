@@ -21,7 +21,7 @@ def data_dialog(root: tk.Misc, data: T, title: str, view_func: Callable[[T], Vie
             self.ok_pressed = False
             super().__init__(root, title)
 
-        def on_change(self, _action):
+        def on_change(self, _changes):
             if self.view.get_state() is None:
                 self.button.config(state=tk.DISABLED)
             else:
@@ -44,7 +44,7 @@ def data_dialog(root: tk.Misc, data: T, title: str, view_func: Callable[[T], Vie
             self.bind("<Return>", self.ok)
             self.bind("<Escape>", self.cancel)
 
-            self.view.change_listeners.add(self.on_change)
+            self.view.change_bus.subscribe(self.on_change)
 
             box.pack()
 
@@ -1,22 +1,15 @@
 import tkinter as tk
 import typing
-from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
 from typing import Type, Optional, Callable
 
 import tk_utils
 from tk_utils import Spacer
 from traits.core import ViewableRecord, ViewWrapper
+from traits.record import HasHeader
 from traits.views import ListView
 
 
-class HasHeader(ViewableRecord, metaclass=ABCMeta):
-    @staticmethod
-    @abstractmethod
-    def header_names() -> dict[str, str]:
-        pass
-
-
 def header(parent: tk.Frame, view_type: Type[HasHeader]) -> tk.Widget:
     frame = tk.Frame(parent)
 
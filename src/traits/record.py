@@ -0,0 +1,49 @@
+import importlib
+import typing
+from abc import ABC, ABCMeta, abstractmethod
+from dataclasses import dataclass
+
+if typing.TYPE_CHECKING:
+    from traits.core import ViewWrapper
+
+
+@dataclass
+class ViewableRecord(ABC):
+    @abstractmethod
+    def configure(self, *args, **kwargs):
+        pass
+
+    def view(self, *, editing=False) -> 'ViewWrapper':
+        from traits.core import RecordView
+        return RecordView(self, editing)
+
+
+class HasHeader(ViewableRecord, metaclass=ABCMeta):
+    @staticmethod
+    @abstractmethod
+    def header_names() -> dict[str, str]:
+        pass
+
+
+class ConfiguredIn:
+    """
+    The `configure` of a `ViewableRecord`, which is a function in another module, imported only once the record is
+    shown. The record can then be used without importing Tk, such as from the command line. Getting it from the
+    record class, as `ABCMeta` does when the class is created, does not import the module until it is called.
+    """
+    __isabstractmethod__ = False
+
+    def __init__(self, module: str, name: str = 'configure'):
+        self.module = module
+        self.name = name
+
+    def function(self) -> typing.Callable:
+        return getattr(importlib.import_module(self.module), self.name)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return self.function()
+
+    def __call__(self, *args, **kwargs):
+        return self.function()(*args, **kwargs)
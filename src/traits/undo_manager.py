@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional
 
-from traits.core import EditableView, ViewWrapper, Action
+from traits.core import EditableView, ViewWrapper, Action, ChangeBatch
 
 
 @dataclass
@@ -12,34 +12,52 @@ class UndoManager:
     future_actions: list[Action] = field(default_factory=list)
     last_action_time: Optional[datetime] = None
 
+    # the actions are recorded before the view's other listeners are notified of them
+    priority = 1
+
     def __post_init__(self):
-        self.view.change_listeners.add(self.on_change)
-
-    def on_change(self, action):
-        if self.past_actions and datetime.now() - self.last_action_time < timedelta(seconds=5):
-            previous_action = self.past_actions.pop()
-            to_add = [previous_action, action]
-            if type(previous_action) == type(action):
-                stack = previous_action.stack(action)
-                if stack is not None:
-                    to_add = [stack]
-            self.past_actions.extend(to_add)
-        else:
-            self.past_actions.append(action)
-        self.last_action_time = datetime.now()
+        self.view.change_bus.subscribe(self.on_change, self.priority)
+
+    def on_change(self, changes: ChangeBatch):
+        now = datetime.now()
+        stacking = self.past_actions and now - self.last_action_time < timedelta(seconds=5)
+        for action in changes.actions:
+            if stacking:
+                previous_action = self.past_actions.pop()
+                to_add = [previous_action, action]
+                if type(previous_action) == type(action):
+                    stack = previous_action.stack(action)
+                    if stack is not None:
+                        to_add = [stack]
+                self.past_actions.extend(to_add)
+            else:
+                self.past_actions.append(action)
+                stacking = True
+        self.last_action_time = now
         self.future_actions = []
 
-    def undo(self):
+    def undo(self) -> Optional[Action]:
+        """
+        :return: the action undone, if any. The view's change bus is not notified of it.
+        """
+        # actions not yet delivered by the view's change bus come before the one to undo
+        self.view.change_bus.flush()
         if self.past_actions:
             action = self.past_actions.pop()
             action.undo(self.view)
             self.future_actions.append(action)
+            return action
 
-    def redo(self):
+    def redo(self) -> Optional[Action]:
+        """
+        :return: the action redone, if any. The view's change bus is not notified of it.
+        """
+        self.view.change_bus.flush()
         if self.future_actions:
             action = self.future_actions.pop()
             action.do(self.view)
             self.past_actions.append(action)
+            return action
 
     @classmethod
     def from_wrapper(cls, wrapper: ViewWrapper):
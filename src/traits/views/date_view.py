@@ -48,8 +48,8 @@ class MyDate(ViewableRecord):
             # month_entry.string_var.trace('w', update_day)
             # year_entry.string_var.trace('w', update_day)
 
-            month.wrapped_view.change_listeners.add(update_day)
-            year.wrapped_view.change_listeners.add(update_day)
+            month.wrapped_view.change_bus.subscribe(update_day)
+            year.wrapped_view.change_bus.subscribe(update_day)
 
 
 class DateMyDateIso(Isomorphism[date, MyDate]):
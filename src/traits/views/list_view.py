@@ -1,10 +1,13 @@
+import bisect
+import contextlib
 import dataclasses
 import tkinter as tk
 import typing
 from abc import ABC
 from dataclasses import dataclass
+from operator import attrgetter
 from tkinter import messagebox
-from typing import Generic, TypeVar, Optional, Callable, Any
+from typing import Generic, TypeVar, Optional, Callable, Any, ContextManager
 
 from tk_utils import ResettableTimer
 from tk_utils.complete_bind import complete_bind
@@ -14,6 +17,17 @@ from traits.core import EditableView, ViewWrapper, Action
 T = TypeVar('T', bound=Callable[[tk.Widget], tk.Widget])
 
 
+@dataclass
+class ListRow:
+    """
+    The widgets around an item, which are reused for other items by a virtualized list view
+    """
+    frame: tk.Frame
+    edit_button: Optional[tk.Button] = None
+    delete_button: Optional[tk.Button] = None
+    move_arrow: Optional[tk.Label] = None
+
+
 @dataclass
 class ListItemRecord(Generic[T]):
     view: ViewWrapper
@@ -26,16 +40,71 @@ class ListItemRecord(Generic[T]):
     edit_button: Optional[tk.Button]
     placed: bool = False
     actions_log: list[Action] = dataclasses.field(default_factory=list)
+    row: Optional[ListRow] = None
 
     def do_grid(self, row=None):
         if row is not None:
             self.grid_row = row
 
+        # rows of a virtualized list which are out of view have no widgets
+        if self.frame is None:
+            return
+
         if self.placed:
             self.frame.grid_forget()
         self.frame.grid(row=self.grid_row, sticky='EW')
 
 
+class ListItemIndex(Generic[T]):
+    """
+    The items of a list view in order. An item's grid row is greater than those of the items before it, so the items
+    in a range of rows, or at a row, are found by bisecting the items on their grid rows.
+    """
+    grid_row_key = attrgetter('grid_row')
+
+    def __init__(self):
+        self.items: list[ListItemRecord[T]] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, position: int) -> ListItemRecord[T]:
+        return self.items[position]
+
+    def __iter__(self) -> typing.Iterator[ListItemRecord[T]]:
+        return iter(self.items)
+
+    def position(self, item: ListItemRecord[T]) -> int:
+        return bisect.bisect_left(self.items, item.grid_row, key=self.grid_row_key)
+
+    def add(self, item: ListItemRecord[T]):
+        self.items.insert(self.position(item), item)
+
+    def remove(self, item: ListItemRecord[T]):
+        del self.items[self.position(item)]
+
+    def swap_with_below(self, item: ListItemRecord[T]):
+        """
+        Swap an item with the one below, before they swap grid rows
+        """
+        position = self.position(item)
+        self.items[position], self.items[position + 1] = self.items[position + 1], self.items[position]
+
+    def at_row(self, grid_row: int) -> Optional[ListItemRecord[T]]:
+        """
+        :return: the last item whose grid row is at most `grid_row`, or the first item if there is none
+        """
+        if not self.items:
+            return None
+        return self.items[max(bisect.bisect_right(self.items, grid_row, key=self.grid_row_key) - 1, 0)]
+
+    def between_rows(self, first_row: int, last_row: int) -> list[ListItemRecord[T]]:
+        return self.items[
+            bisect.bisect_left(self.items, first_row, key=self.grid_row_key):
+            bisect.bisect_right(self.items, last_row, key=self.grid_row_key)
+        ]
+
+
 class ListChangeAction(Action, ABC):
     pass
 
@@ -52,6 +121,23 @@ class ListItemCreate(ListChangeAction):
         view.delete_item(view.dummy_last_item.previous_item)
 
 
+@dataclass
+class ListItemCreateMany(ListChangeAction):
+    first_id: int
+    data: list[Any]
+
+    def do(self, view: '_ListView'):
+        with view.layout_batch():
+            for i, item in enumerate(self.data):
+                view.add(item, self.first_id + i, realise=not view.virtualized)
+            view.scroll_to_end()
+
+    def undo(self, view: '_ListView'):
+        with view.layout_batch():
+            for _ in self.data:
+                view.delete_item(view.dummy_last_item.previous_item)
+
+
 @dataclass
 class ListItemDelete(ListChangeAction):
     id_: int
@@ -90,12 +176,16 @@ class ListItemInnerAction(ListChangeAction):
 
     def do(self, view: '_ListView'):
         item_record = view.nodes[self.id_]
+        view.changed_at(item_record)
         view: EditableView = item_record.view.wrapped_view
+        view.invalidate_state()
         self.inner_action.do(view)
 
     def undo(self, view: '_ListView'):
         item_record = view.nodes[self.id_]
+        view.changed_at(item_record)
         view: EditableView = item_record.view.wrapped_view
+        view.invalidate_state()
         self.inner_action.undo(view)
 
     def stack(self, other: 'Action') -> 'Optional[Action]':
@@ -125,6 +215,7 @@ class ListItemSave(ListChangeAction):
 
     def undo(self, view: '_ListView'):
         item_record = view.nodes[self.id_]
+        view.ensure_realised(item_record)
         item_record.item_widget.destroy()
         item_record.view.data = self.original_data
 
@@ -147,6 +238,7 @@ class ListItemEdit(ListChangeAction):
 
     def do(self, view: '_ListView'):
         item_record = view.nodes[self.id_]
+        view.ensure_realised(item_record)
 
         item_record.item_widget.destroy()
         item_record.view.editing = True
@@ -214,17 +306,45 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
 
     buttons_width = 100
 
+    # only create widgets for the items in view, with `overscan` rows to either side
+    virtualized = False
+    overscan = 5
+    # the height of an item before one has been shown, in pixels
+    estimated_row_height = 30
+
     @property
     def widget(self):
         return self.frame
 
     def get_state(self) -> Optional[list[T]]:
-        item: ViewWrapper
-        items = [item.get_state() for item in self.iter_items()]
-        if any(item is None for item in items):
-            return
-        else:
-            return items
+        if self.state is None:
+            item: ViewWrapper
+            items = [item.get_state() for item in self.iter_items()]
+            if any(item is None for item in items):
+                return
+            self.state = items
+        # the items are shared with the previous states, but not the list, so that it may be changed by the caller
+        return list(self.state)
+
+    def invalidate_state(self):
+        self.state = None
+
+    def changed_at(self, item_record: ListItemRecord[T]):
+        """
+        Note that the item of `item_record` is added, removed, moved or changed, so that the items from its position on
+        may differ from the last state
+        """
+        position = self.item_index.position(item_record)
+        if self.first_changed is None or position < self.first_changed:
+            self.first_changed = position
+
+    def take_first_changed(self) -> Optional[int]:
+        """
+        :return: the position of the first item which may have been added, removed, moved or changed since this was last
+        called, or None if there is none. The items before it are the same, in the same order.
+        """
+        first_changed, self.first_changed = self.first_changed, None
+        return first_changed
 
     @staticmethod
     def view(parent, data):
@@ -234,6 +354,11 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
     def __init__(self, parent, data: list[T], editable=True):
         super().__init__()
 
+        # the state last made by `get_state`, until an item is added, removed, moved or changed
+        self.state: Optional[list[T]] = None
+        # see `take_first_changed`
+        self.first_changed: Optional[int] = None
+
         # noinspection PyTypeChecker
         self.dummy_first_item = ListItemRecord(
             None, None,
@@ -251,6 +376,8 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
             node.id_: node for node in
             (self.dummy_first_item, self.dummy_last_item)
         }
+        # the items other than the dummies, in order
+        self.item_index: ListItemIndex[T] = ListItemIndex()
 
         self.frame = tk.Frame(parent)
         self.list_frame = VerticalScrolledFrame(self.frame)
@@ -279,9 +406,27 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
 
         self.list_frame.interior.bind_all('<ButtonRelease-1>', stop_dragging, add='+')
 
-        for x in data:
-            self.add(x, self.next_id)
-            self.next_id += 1
+        self.row_height = self.estimated_row_height
+        self.row_height_measured = False
+        self.unused_rows: list[ListRow] = []
+        # the items which have widgets, by id
+        self.realised_items: dict[int, ListItemRecord] = {}
+        self.viewport_update_pending = False
+
+        # the number of `layout_batch` contexts entered, and what they have deferred
+        self.layout_batch_depth = 0
+        self.pending_grid: dict[int, ListItemRecord] = {}
+        self.pending_scroll_to_end = False
+
+        with self.layout_batch():
+            for x in data:
+                self.add(x, self.next_id, realise=not self.virtualized)
+                self.next_id += 1
+
+        if self.virtualized:
+            self.list_frame.scroll_listeners.add(self.schedule_viewport_update)
+            self.list_frame.scroll_to_end()
+            self.schedule_viewport_update()
 
     @staticmethod
     def place_item(item: tk.Widget):
@@ -311,116 +456,280 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
             self.action(ListItemEdit(item_record.id_))
 
     def add(self, data: T, id_: int, editing_item: bool = False,
-            previous_item: ListItemRecord = None, grid_row: int = None):
+            previous_item: ListItemRecord = None, grid_row: int = None, realise: bool = True):
+        """
+        :param realise: whether to create the item's widgets and scroll to it, otherwise a virtualized list creates
+        them once the item is scrolled into view
+        """
+        self.invalidate_state()
         if self.item_view_func:
             item_func = type(self).item_view_func(data)
         else:
             item_func = data.view()
 
-        item_frame = tk.Frame(self.list_frame.interior, borderwidth=1, highlightbackground="blue")
         if self.editable and editing_item:
             item_func.editing = True
-        item = item_func(item_frame)
-
-        self.place_item(item)
-        item_frame.grid_columnconfigure(1, weight=1)
-
-        buttons_frame = tk.Frame(item_frame)
-        buttons_frame.grid(row=0, column=2)
-        item_frame.grid_columnconfigure(2, minsize=self.buttons_width, weight=0)
-
-        edit_button = None
-
-        if self.editable:
-            edit_button = tk.Button(buttons_frame, text="Save" if item_func.editing else "Edit",
-                                    command=lambda: self.edit_item(item_record))
-            edit_button.grid(row=0, column=0)
-
-            move_arrow = tk.Label(item_frame, text='↕', cursor='fleur')
-            move_arrow.grid(row=0, column=0)
-
-            def start_dragging(_e):
-                self.dragged_item = item_record
-                item_frame.config(highlightthickness=1)
-
-            move_arrow.bind('<ButtonPress-1>', start_dragging)
-
-            def delete_function():
-                if item_func.editing:
-                    self.action(ListItemDeleteEditing(
-                        item_record.id_, item_record.view.data, item_record.previous_item.id_,
-                        item_record.grid_row, list(item_record.actions_log)
-                    ))
-                else:
-                    self.action(ListItemDelete(
-                        item_record.id_, item_record.view.data, item_record.previous_item.id_,
-                        item_record.grid_row
-                    ))
-
-            delete_button = tk.Button(
-                buttons_frame, text='X',
-                command=delete_function
-            )
-            delete_button.grid(row=0, column=1)
 
         if previous_item is None:
             previous_item = self.dummy_last_item.previous_item
         if grid_row is None:
             grid_row = previous_item.grid_row + 1
         item_record = ListItemRecord(
-            item_func, item_frame, grid_row,
+            item_func, None, grid_row,
             next_item=previous_item.next_item, previous_item=previous_item,
-            id_=id_, item_widget=item, edit_button=edit_button
+            id_=id_, item_widget=None, edit_button=None
         )
         previous_item.next_item.previous_item = item_record
         previous_item.next_item = item_record
 
-        item_record.do_grid()
-
         self.nodes[item_record.id_] = item_record
+        self.item_index.add(item_record)
+        self.changed_at(item_record)
+
+        if self.virtualized:
+            self.list_frame.interior.grid_rowconfigure(grid_row, minsize=self.row_height)
+
+        if not realise:
+            return
+
+        self.realise(item_record)
 
         if editing_item:
             self.register_events(item_record)
 
-        self.frame.update_idletasks()
-        self.list_frame.scroll_to_end()
+        self.scroll_to_end()
+
+        return item_record.item_widget
+
+    def add_many(self, items: list[T]):
+        """
+        Add items which are already complete, so they are not opened for editing, in one action
+        """
+        if items:
+            self.action(ListItemCreateMany(self.next_id, list(items)))
+            self.next_id += len(items)
+
+    @contextlib.contextmanager
+    def layout_batch(self):
+        """
+        Defer laying out the items until the outermost batch ends. Then each item which was added or moved is gridded
+        once, and if an item was added the list is scrolled to the end once, rather than the geometry being updated
+        for every change.
+        """
+        self.layout_batch_depth += 1
+        try:
+            yield
+        finally:
+            self.layout_batch_depth -= 1
+            if self.layout_batch_depth == 0:
+                pending_grid, self.pending_grid = self.pending_grid, {}
+                for item_record in pending_grid.values():
+                    # items deleted or scrolled out of view during the batch have no widgets to grid
+                    if self.nodes.get(item_record.id_) is item_record and item_record.frame is not None:
+                        item_record.do_grid()
+
+                if self.pending_scroll_to_end:
+                    self.pending_scroll_to_end = False
+                    self.scroll_to_end()
+
+    def grid_item(self, item_record: ListItemRecord):
+        if self.layout_batch_depth:
+            self.pending_grid[item_record.id_] = item_record
+        else:
+            item_record.do_grid()
+
+    def scroll_to_end(self):
+        if self.layout_batch_depth:
+            self.pending_scroll_to_end = True
+        else:
+            self.frame.update_idletasks()
+            self.list_frame.scroll_to_end()
+
+    def make_row(self) -> ListRow:
+        item_frame = tk.Frame(self.list_frame.interior, borderwidth=1, highlightbackground="blue")
+        item_frame.grid_columnconfigure(1, weight=1)
+
+        buttons_frame = tk.Frame(item_frame)
+        buttons_frame.grid(row=0, column=2)
+        item_frame.grid_columnconfigure(2, minsize=self.buttons_width, weight=0)
+
+        row = ListRow(item_frame)
+        if self.editable:
+            row.edit_button = tk.Button(buttons_frame)
+            row.edit_button.grid(row=0, column=0)
+
+            row.move_arrow = tk.Label(item_frame, text='↕', cursor='fleur')
+            row.move_arrow.grid(row=0, column=0)
+
+            row.delete_button = tk.Button(buttons_frame, text='X')
+            row.delete_button.grid(row=0, column=1)
 
-        return item
+        return row
+
+    def bind_row(self, row: ListRow, item_record: ListItemRecord):
+        """
+        Make the buttons of `row` act on `item_record`
+        """
+        if not self.editable:
+            return
+
+        item_func = item_record.view
+
+        # the row may have been that of an item being edited while it was invalid, see `register_events`
+        row.edit_button.config(text="Save" if item_func.editing else "Edit", state=tk.NORMAL,
+                               command=lambda: self.edit_item(item_record))
+
+        def start_dragging(_e):
+            self.dragged_item = item_record
+            row.frame.config(highlightthickness=1)
+
+        row.move_arrow.bind('<ButtonPress-1>', start_dragging)
+
+        def delete_function():
+            if item_func.editing:
+                self.action(ListItemDeleteEditing(
+                    item_record.id_, item_record.view.data, item_record.previous_item.id_,
+                    item_record.grid_row, list(item_record.actions_log)
+                ))
+            else:
+                self.action(ListItemDelete(
+                    item_record.id_, item_record.view.data, item_record.previous_item.id_,
+                    item_record.grid_row
+                ))
+
+        row.delete_button.config(command=delete_function)
+
+    def realise(self, item_record: ListItemRecord):
+        """
+        Create the widgets of an item, reusing the frame and buttons of an item which went out of view if possible
+        """
+        row = self.unused_rows.pop() if self.unused_rows else self.make_row()
+        self.bind_row(row, item_record)
+
+        item_record.row = row
+        self.realised_items[item_record.id_] = item_record
+        item_record.frame = row.frame
+        item_record.edit_button = row.edit_button
+        item_record.item_widget = item_record.view(row.frame)
+        self.place_item(item_record.item_widget)
+
+        self.grid_item(item_record)
+
+    def unrealise(self, item_record: ListItemRecord):
+        item_record.item_widget.destroy()
+        item_record.frame.grid_forget()
+        item_record.frame.config(highlightthickness=0)
+        self.unused_rows.append(item_record.row)
+        del self.realised_items[item_record.id_]
+
+        item_record.row = None
+        item_record.frame = None
+        item_record.edit_button = None
+        item_record.item_widget = None
+
+    def ensure_realised(self, item_record: ListItemRecord):
+        if item_record.frame is None:
+            self.realise(item_record)
+
+    def schedule_viewport_update(self):
+        if not self.viewport_update_pending:
+            self.viewport_update_pending = True
+            self.frame.after_idle(self.update_viewport)
+
+    def update_viewport(self):
+        """
+        Create the widgets of the items in view, and reuse those of items which went out of view. Items being edited
+        or dragged keep their widgets.
+        """
+        self.viewport_update_pending = False
+        if not self.frame.winfo_exists():
+            return
+
+        interior = self.list_frame.interior
+        top, bottom = self.list_frame.canvas.yview()
+        height = interior.winfo_height()
+        margin = self.overscan * self.row_height
+        _, first_row = interior.grid_location(0, int(top * height - margin))
+        _, last_row = interior.grid_location(0, int(bottom * height + margin))
+
+        for node in list(self.realised_items.values()):
+            in_view = first_row <= node.grid_row <= last_row
+            if not in_view and not node.view.editing and node is not self.dragged_item:
+                self.unrealise(node)
+
+        to_realise = [node for node in self.item_index.between_rows(first_row, last_row) if node.frame is None]
+        for node in to_realise:
+            self.realise(node)
+
+        if to_realise and not self.row_height_measured:
+            self.measure_row_height(to_realise[0])
+
+    def measure_row_height(self, item_record: ListItemRecord):
+        """
+        Size the placeholders of the items out of view like a shown item
+        """
+        self.row_height_measured = True
+        item_record.frame.update_idletasks()
+        row_height = item_record.frame.winfo_reqheight()
+        if row_height != self.row_height:
+            self.row_height = row_height
+            for node in self.item_index:
+                self.list_frame.interior.grid_rowconfigure(node.grid_row, minsize=row_height)
 
     def delete_item(self, node: ListItemRecord[T]):
-        node.frame.destroy()
+        self.invalidate_state()
+        self.changed_at(node)
+        if self.virtualized:
+            if node.frame is not None:
+                self.unrealise(node)
+            self.list_frame.interior.grid_rowconfigure(node.grid_row, minsize=0)
+        else:
+            node.frame.destroy()
+            del self.realised_items[node.id_]
         node.next_item.previous_item = node.previous_item
         node.previous_item.next_item = node.next_item
 
         self.nodes.pop(node.id_)
+        self.item_index.remove(node)
 
     def on_motion(self, e):
         if self.dragged_item is None:
             return
 
+        interior = self.list_frame.interior
+
         def item_mid_y(item: ListItemRecord[T]):
-            if item is self.dummy_first_item:
-                return -float('inf')
-            elif item is self.dummy_last_item:
-                return float('inf')
+            if item.frame is None:
+                _, y, _, height = interior.grid_bbox(0, item.grid_row)
+                return interior.winfo_rooty() + y + height / 2
             else:
                 return item.frame.winfo_rooty() + item.frame.winfo_height() / 2
 
+        # the item under the pointer is found from its grid row, rather than by comparing with each item on the way
         y = e.y_root
-        while True:
-            if y > item_mid_y(self.dragged_item.next_item):
-                swap1 = self.dragged_item
-            elif y < item_mid_y(self.dragged_item.previous_item):
-                swap1 = self.dragged_item.previous_item
-            else:
-                break
+        _, grid_row = interior.grid_location(0, y - interior.winfo_rooty())
+        target = self.item_index.at_row(grid_row)
+        dragged = self.dragged_item
+        if target is dragged:
+            return
 
-            self.action(ListItemSwapWithBelow(swap1.id_, swap1.next_item.id_))
+        # the dragged item passes the item under the pointer once the pointer is past its middle
+        with self.layout_batch():
+            if target.grid_row > dragged.grid_row:
+                last_passed = target if y > item_mid_y(target) else target.previous_item
+                while dragged.grid_row < last_passed.grid_row:
+                    self.action(ListItemSwapWithBelow(dragged.id_, dragged.next_item.id_))
+            else:
+                last_passed = target if y < item_mid_y(target) else target.next_item
+                while dragged.grid_row > last_passed.grid_row:
+                    self.action(ListItemSwapWithBelow(dragged.previous_item.id_, dragged.id_))
 
-    @staticmethod
-    def swap_with_below(node: ListItemRecord):
+    def swap_with_below(self, node: ListItemRecord):
+        self.invalidate_state()
+        self.changed_at(node)
         swap1 = node
         swap2 = swap1.next_item
+        self.item_index.swap_with_below(swap1)
 
         swap1.next_item = swap2.next_item
         swap2.previous_item = swap1.previous_item
@@ -432,14 +741,11 @@ class _ListView(Generic[T], EditableView[list[T], ListChangeAction]):
         swap2.previous_item.next_item = swap2
 
         swap1.grid_row, swap2.grid_row = swap2.grid_row, swap1.grid_row
-        swap1.do_grid()
-        swap2.do_grid()
+        self.grid_item(swap1)
+        self.grid_item(swap2)
 
     def iter_items(self) -> typing.Iterator[T]:
-        node = self.dummy_first_item
-        while node.next_item is not self.dummy_last_item:
-            node = node.next_item
-
+        for node in self.item_index:
             yield node.view
 
 
@@ -449,6 +755,30 @@ U = TypeVar('U')
 class ListView(ViewWrapper[list[U]], Generic[U]):
     wrapping_class = _ListView
 
+    def add_many(self, items: list[U]):
+        """
+        Add items to the list as it is shown, in one action, see `_ListView.add_many`
+        """
+        typing.cast(_ListView, self.wrapped_view).add_many(items)
+
+    def take_first_changed(self) -> Optional[int]:
+        """
+        :return: the position of the first item changed since this was last called, see `_ListView.take_first_changed`,
+        or 0 while the list is not shown
+        """
+        if self.wrapped_view is None:
+            return 0
+        return typing.cast(_ListView, self.wrapped_view).take_first_changed()
+
+    def layout_batch(self) -> ContextManager:
+        """
+        :return: a context deferring the layout of the list's items while it is changed many times, see
+        `_ListView.layout_batch`
+        """
+        if self.wrapped_view is None:
+            return contextlib.nullcontext()
+        return typing.cast(_ListView, self.wrapped_view).layout_batch()
+
     @staticmethod
     def add_button(new_item_func: Callable[[], U], *, text: str = 'Add') \
             -> Callable[[tk.Frame, Callable[[T], None]], tk.Widget]:
@@ -459,8 +789,13 @@ class ListView(ViewWrapper[list[U]], Generic[U]):
 
     def __call__(self, parent: tk.Misc,
                  item_view_func: Callable[[U], ViewWrapper] = None,
-                 add_button_widget_func: Callable[[tk.Frame, Callable[[U], None]], tk.Widget] = None) -> tk.Widget:
+                 add_button_widget_func: Callable[[tk.Frame, Callable[[U], None]], tk.Widget] = None,
+                 virtualized: bool = False) -> tk.Widget:
+        """
+        :param virtualized: only create the widgets of the items in view, which suits long lists
+        """
         return self._call_with_kwargs(parent, {
             'item_view_func': item_view_func,
-            'add_button_widget_func': add_button_widget_func
+            'add_button_widget_func': add_button_widget_func,
+            'virtualized': virtualized
         })